@@ -0,0 +1,65 @@
+"""
+The consolidated analysis outputs, loaded once and shared by the analyses.
+
+`descriptive_analysis.py` and `statistical_analysis.py` run several analyses
+on the same tidy and profiles files. An `AnalysisDataset` reads both once,
+with their artifact dtypes, merges the profile of every job into the tidy
+rows and splits them by category type, so each analysis starts from the
+rows it needs instead of reloading and re-filtering the files.
+"""
+
+from pathlib import Path
+from typing import Dict, List
+
+import pandas as pd
+
+from artifacts import read_artifact
+
+WORKSPACE_DIR = Path(__file__).resolve().parent.parent
+INPUT_TIDY_CSV = WORKSPACE_DIR / "data" / "automated_analysis_consolidated.csv"
+INPUT_PROFILES_CSV = WORKSPACE_DIR / "data" / "automated_analysis_profiles.csv"
+TIDY_COLUMNS = ["job_id", "category_type", "category_name", "tool_name"]
+PROFILE_COLUMNS = ["job_id", "profile"]
+
+
+class AnalysisDataset:
+    """
+    Tidy analysis rows with the profile of their job, plus one profile row
+    per job.
+
+    `tidy` holds every row, `profiles` the profiles as loaded, and
+    `category(category_type)` the rows of one category type, split once.
+    The frames are shared: analyses that modify them must copy first.
+    """
+
+    def __init__(self, tidy: pd.DataFrame, profiles: pd.DataFrame):
+        self.profiles = profiles
+        self.tidy = tidy.merge(profiles, on="job_id", how="left")
+        self.by_type: Dict[str, pd.DataFrame] = {
+            category_type: rows
+            for category_type, rows in self.tidy.groupby(
+                "category_type", observed=True, sort=False
+            )
+        }
+
+    @classmethod
+    def load(
+        cls, tidy_path: Path = INPUT_TIDY_CSV, profiles_path: Path = INPUT_PROFILES_CSV
+    ) -> "AnalysisDataset":
+        """Reads the columns the analyses use from the newest copy of each artifact."""
+        print(f"Loading analysis dataset from {tidy_path} and {profiles_path}...")
+        return cls(
+            read_artifact(tidy_path, columns=TIDY_COLUMNS),
+            read_artifact(profiles_path, columns=PROFILE_COLUMNS),
+        )
+
+    def category(self, category_type: str) -> pd.DataFrame:
+        """The rows of `category_type`; empty if there are none."""
+        return self.by_type.get(category_type, self.tidy.iloc[:0])
+
+    def for_profiles(
+        self, profiles: List[str], category_type: str | None = None
+    ) -> pd.DataFrame:
+        """The rows of jobs with one of `profiles`, optionally of one category type."""
+        rows = self.tidy if category_type is None else self.category(category_type)
+        return rows[rows["profile"].isin(profiles)]
@@ -0,0 +1,120 @@
+"""
+Detection of the schema versions of automated analysis files.
+
+The extraction prompt changed over time, so `profile_classification` lists
+its technologies and soft skills in one of three item shapes, while current
+files only carry a `thematic_analysis`. `detect_schema` classifies a file
+once, together with the shape of every list item, so the consolidation can
+dispatch each item to its normalizer without re-inspecting it.
+"""
+
+from typing import Any, Dict, List, Tuple
+
+# Schema versions, by the item shapes they use.
+THEMATIC = "thematic"  # Only thematic_analysis; no item lists in the classification.
+FORMAT_1 = "format_1"  # {"tech", "items"} and {"skill", "evidence"}.
+FORMAT_2 = "format_2"  # Flat {"category", "justification", ...} items.
+FORMAT_3 = "format_3"  # {"technology", ...} and {"skill_category", "phrases"}.
+MIXED = "mixed"  # Item shapes of several formats in one file.
+PROFILE_ONLY = "profile_only"  # A classification without any items.
+REJECTED = "rejected"
+
+SCHEMA_ITEM_KINDS = {
+    FORMAT_1: {"nested"},
+    FORMAT_2: {"category"},
+    FORMAT_3: {"technology", "skill_category"},
+}
+
+# Singular category types of the thematic_analysis sections.
+CATEGORY_TYPES = {
+    "job_tasks": "job_task",
+    "technologies": "technology",
+    "soft_skills": "soft_skill",
+}
+
+
+def technology_kind(item: Any) -> str | None:
+    if not isinstance(item, dict):
+        return None
+    if "tech" in item and "items" in item:
+        return "nested"
+    if "technology" in item:
+        return "technology"
+    if "category" in item:
+        return "category"
+    return None
+
+
+def soft_skill_kind(item: Any) -> str | None:
+    if not isinstance(item, dict):
+        return None
+    if "skill" in item and "evidence" in item:
+        return "nested"
+    if "category" in item:
+        return "category"
+    if "skill_category" in item:
+        return "skill_category"
+    return None
+
+
+def category_type(section: str) -> str:
+    """The singular category type of a thematic_analysis section."""
+    if section in CATEGORY_TYPES:
+        return CATEGORY_TYPES[section]
+    singular = section.rstrip("s")
+    return "technology" if singular == "technologie" else singular
+
+
+def detect_schema(
+    data: Any,
+) -> Tuple[str, str | None, List[str | None], List[str | None]]:
+    """
+    Classifies one analysis file.
+
+    Returns the schema version, the reason if the file is rejected, and the
+    kind of every technology and soft skill item of its profile
+    classification (None for items of no known shape).
+    """
+    if not isinstance(data, dict) or not data:
+        return REJECTED, "empty or invalid JSON", [], []
+    analysis = data.get("analysis")
+    if not isinstance(analysis, dict):
+        return REJECTED, "no analysis object", [], []
+    if "thematic_analysis" not in analysis and "profile_classification" not in analysis:
+        return REJECTED, "neither thematic_analysis nor profile_classification", [], []
+    thematic = analysis.get("thematic_analysis")
+    if thematic is not None and not isinstance(thematic, dict):
+        return REJECTED, "thematic_analysis is not an object", [], []
+
+    classification = analysis.get("profile_classification")
+    technologies: List[Any] = []
+    soft_skills: List[Any] = []
+    if isinstance(classification, dict):
+        technologies = classification.get("technologies", []) or []
+        soft_skills = classification.get("soft_skills", []) or []
+
+    technology_kinds = [technology_kind(item) for item in technologies]
+    soft_skill_kinds = [soft_skill_kind(item) for item in soft_skills]
+    kinds = set(technology_kinds + soft_skill_kinds) - {None}
+    if not kinds:
+        schema = THEMATIC if thematic is not None else PROFILE_ONLY
+    else:
+        schema = next(
+            (s for s, allowed in SCHEMA_ITEM_KINDS.items() if kinds <= allowed), MIXED
+        )
+    return schema, None, technology_kinds, soft_skill_kinds
+
+
+def schema_report(schemas: List[str], rejects: Dict[str, List[Any]]) -> str:
+    """A short summary of the schema versions seen and the rejected files/items."""
+    counts: Dict[str, int] = {}
+    for schema in schemas:
+        counts[schema] = counts.get(schema, 0) + 1
+    lines = ["Analysis schema versions:"]
+    lines += [f"  {schema}: {count}" for schema, count in sorted(counts.items())]
+    reasons: Dict[str, int] = {}
+    for reason in rejects["reason"]:
+        reasons[reason] = reasons.get(reason, 0) + 1
+    lines.append(f"Rejected files and items: {len(rejects['reason'])}")
+    lines += [f"  {reason}: {count}" for reason, count in sorted(reasons.items())]
+    return "\n".join(lines)
@@ -0,0 +1,215 @@
+"""Result sinks for automated analyses: one JSON file per job or an append-only JSONL store."""
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterator, Tuple
+
+INDEX_FILE = "index.tsv"
+SHARD_PATTERN = "shard-{:05d}.jsonl"
+
+
+def write_json_atomically(output_path: Path, payload: Dict[str, Any]) -> int:
+    """
+    Writes `payload` as indented JSON via a temporary file and a rename.
+
+    An interrupted run therefore never leaves a truncated file behind that a
+    resume check would mistake for a finished job. Returns the bytes written.
+    """
+    tmp_path = output_path.with_suffix(output_path.suffix + ".tmp")
+    data = json.dumps(payload, ensure_ascii=False, indent=4).encode("utf-8")
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, output_path)
+    return len(data)
+
+
+class JsonDirectorySink:
+    """The original layout: `analysis_job_{id}.json` files in one directory."""
+
+    def __init__(self, output_dir: Path):
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+
+    def path_for(self, job_id: int) -> Path:
+        return self.output_dir / f"analysis_job_{job_id}.json"
+
+    def __contains__(self, job_id: int) -> bool:
+        return self.path_for(job_id).exists()
+
+    def job_ids(self) -> set[int]:
+        """The ids of all stored analyses, from a single directory listing."""
+        job_ids = set()
+        with os.scandir(self.output_dir) as entries:
+            for entry in entries:
+                name = entry.name
+                if name.startswith("analysis_job_") and name.endswith(".json"):
+                    stem = name[len("analysis_job_") : -len(".json")]
+                    if stem.isdigit():
+                        job_ids.add(int(stem))
+        return job_ids
+
+    def write(self, record: Dict[str, Any]) -> int:
+        return write_json_atomically(self.path_for(record["job_id"]), record)
+
+    def describe(self, job_id: int) -> str:
+        return str(self.path_for(job_id))
+
+
+class AnalysisStore:
+    """
+    An append-only, sharded JSONL store with a job_id -> (shard, offset, length) index.
+
+    Records are appended to `shard-NNNNN.jsonl` files (a new shard is started
+    once `shard_max_bytes` is reached) and fsynced before their index line is
+    written to `index.tsv`. On open, any complete records found past the last
+    indexed offset are re-indexed and a torn trailing line is truncated, so a
+    crash at any point loses at most the record being written. Re-analysing a
+    job appends a new version; the index always points at the latest one.
+
+    With `read_only`, nothing is written, truncated or created: complete
+    records past the index are only indexed in memory, and incomplete lines
+    are ignored, since they may belong to a writer that is still appending.
+    Readers must use this mode while an extraction run may be active.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        shard_max_bytes: int = 64 * 1024 * 1024,
+        read_only: bool = False,
+    ):
+        self.root = Path(root)
+        self.read_only = read_only
+        if not read_only:
+            self.root.mkdir(parents=True, exist_ok=True)
+        self.shard_max_bytes = shard_max_bytes
+        self.index: Dict[int, Tuple[int, int, int]] = {}
+        # End of the last indexed record per shard, including superseded versions.
+        self.indexed_end: Dict[int, int] = {}
+        self.lock = threading.Lock()
+        self.index_file = None
+        self._load_index()
+        if not read_only:
+            self.index_file = open(self.root / INDEX_FILE, "a", encoding="utf-8")
+        self._recover()
+        shards = self._shards()
+        self.current_shard = shards[-1] if shards else 0
+        current_path = self._shard_path(self.current_shard)
+        self.current_size = current_path.stat().st_size if current_path.exists() else 0
+
+    # --- Index maintenance ---
+
+    def _shard_path(self, shard: int) -> Path:
+        return self.root / SHARD_PATTERN.format(shard)
+
+    def _shards(self) -> list[int]:
+        return sorted(int(p.stem.split("-")[1]) for p in self.root.glob("shard-*.jsonl"))
+
+    def _load_index(self) -> None:
+        index_path = self.root / INDEX_FILE
+        if not index_path.exists():
+            return
+        with open(index_path, "rb") as f:
+            data = f.read()
+        complete = data[: data.rfind(b"\n") + 1]
+        if len(complete) != len(data) and not self.read_only:
+            # Drop a torn index line; the recovery scan re-indexes its record.
+            with open(index_path, "r+b") as f:
+                f.truncate(len(complete))
+        for line in complete.decode("utf-8").splitlines():
+            job_id, shard, offset, length = (int(v) for v in line.split("\t"))
+            self.index[job_id] = (shard, offset, length)
+            self.indexed_end[shard] = max(self.indexed_end.get(shard, 0), offset + length)
+
+    def _recover(self) -> None:
+        for shard in self._shards():
+            path = self._shard_path(shard)
+            start = self.indexed_end.get(shard, 0)
+            if path.stat().st_size <= start:
+                continue
+            with open(path, "rb") as f:
+                f.seek(start)
+                tail = f.read()
+            offset = start
+            for line in tail.splitlines(keepends=True):
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    break
+                self._write_index_entry(record["job_id"], shard, offset, len(line))
+                offset += len(line)
+            if offset < start + len(tail) and not self.read_only:
+                print(f"Truncating incomplete record at {path.name}:{offset}")
+                with open(path, "r+b") as f:
+                    f.truncate(offset)
+
+    def _write_index_entry(self, job_id: int, shard: int, offset: int, length: int) -> None:
+        if self.index_file is not None:
+            self.index_file.write(f"{job_id}\t{shard}\t{offset}\t{length}\n")
+            self.index_file.flush()
+        self.index[int(job_id)] = (shard, offset, length)
+
+    # --- Sink interface ---
+
+    def __contains__(self, job_id: int) -> bool:
+        return int(job_id) in self.index
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def job_ids(self) -> set[int]:
+        return set(self.index)
+
+    def write(self, record: Dict[str, Any]) -> int:
+        """Appends one record durably. Returns the bytes written."""
+        if self.read_only:
+            raise PermissionError(f"Analysis store {self.root} was opened read-only.")
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        with self.lock:
+            if self.current_size and self.current_size + len(line) > self.shard_max_bytes:
+                self.current_shard += 1
+                self.current_size = 0
+            offset = self.current_size
+            with open(self._shard_path(self.current_shard), "ab") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+            self.current_size += len(line)
+            self._write_index_entry(record["job_id"], self.current_shard, offset, len(line))
+        return len(line)
+
+    def describe(self, job_id: int) -> str:
+        shard, offset, _ = self.index[int(job_id)]
+        return f"{self._shard_path(shard)}@{offset}"
+
+    def close(self) -> None:
+        with self.lock:
+            if self.index_file is not None:
+                self.index_file.close()
+
+    # --- Readers ---
+
+    def get(self, job_id: int) -> Dict[str, Any] | None:
+        """Random access to the latest record of `job_id`."""
+        entry = self.index.get(int(job_id))
+        if entry is None:
+            return None
+        shard, offset, length = entry
+        with open(self._shard_path(shard), "rb") as f:
+            f.seek(offset)
+            return json.loads(f.read(length))
+
+    def iter_records(self) -> Iterator[Dict[str, Any]]:
+        """Yields the latest record of every job with one sequential read per shard."""
+        current = {(shard, offset) for shard, offset, _ in self.index.values()}
+        for shard in self._shards():
+            offset = 0
+            with open(self._shard_path(shard), "rb") as f:
+                for line in f:
+                    if (shard, offset) in current:
+                        yield json.loads(line)
+                    offset += len(line)
@@ -1,13 +1,39 @@
 import os
 from dotenv import load_dotenv
 import google.generativeai as genai
+from google.generativeai import caching
 import pandas as pd
+import argparse
+from collections import defaultdict
+import datetime
+import hashlib
 import json
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, replace
 from pathlib import Path
 import time
 import math
 from tqdm import tqdm
-from typing import List, TypedDict
+from typing import Callable, Collection, Iterable, Iterator, List, TypedDict
+
+from rate_limiting import (
+    AdaptiveConcurrency,
+    RateLimiter,
+    RetryPolicy,
+    call_with_retries,
+)
+from response_cache import ResponseCache, make_cache_key
+from llm_backends import (
+    BATCH_JOB_HEADER,
+    BackendResponse,
+    GeminiBackend,
+    LLMBackend,
+    MockBackend,
+)
+from analysis_store import AnalysisStore, JsonDirectorySink
+from artifacts import iter_artifact_chunks
+from run_manifest import RunManifest
+from extraction_metrics import CallMetrics, MetricsRecorder
 
 
 # --- Schema Definition ---
@@ -43,24 +69,28 @@ class Analysis(TypedDict):
     thematic_analysis: ThematicAnalysis
 
 
-# --- Configuration ---
-load_dotenv()  # Load variables from .env file
+class BatchItem(TypedDict):
+    job_id: int
+    analysis: Analysis
 
-API_KEY = os.getenv("GOOGLE_API_KEY")
-if not API_KEY:
-    raise ValueError("GOOGLE_API_KEY not found in environment variables or .env file.")
 
-genai.configure(api_key=API_KEY)
+# --- Configuration ---
+load_dotenv()  # Load variables from .env file
 
 MODEL_NAME = os.getenv("GEMINI_MODEL", "gemini-1.5-pro-latest")
+# Output limit of the model; newer models allow more than 8192 tokens.
+MAX_OUTPUT_TOKENS = int(os.getenv("GEMINI_MAX_OUTPUT_TOKENS", "8192"))
 GENERATION_CONFIG = {
     "temperature": 0.2,  # 0.1 = low diversity, 1 = high diversity
     "top_p": 1,  # 1 = no diversity, 0 = full diversity # default is 1
     "top_k": 1,  # 1 = no diversity, 0 = full diversity # default is 1
-    "max_output_tokens": 8192,
+    "max_output_tokens": MAX_OUTPUT_TOKENS,
     "response_mime_type": "application/json",
     "response_schema": Analysis,
 }
+# Output budget per ad in batch mode: existing analyses take about 960 output
+# tokens at the median and 1,600 at the 90th percentile.
+BATCH_OUTPUT_TOKENS_PER_AD = 1600
 SAFETY_SETTINGS = [
     {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE"},
     {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE"},
@@ -75,12 +105,87 @@ CODING_BOOK_PATH = WORKSPACE_DIR / "CODING_BOOK.md"
 INPUT_DATA_PATH = WORKSPACE_DIR / "data" / "consolidated_deduplicated.csv"
 OUTPUT_DIR = WORKSPACE_DIR / "data" / "automated_analysis"
 FAILED_DIR = OUTPUT_DIR / "failed"
+STORE_DIR = WORKSPACE_DIR / "data" / "automated_analysis_store"
+# Numeric input columns; all others are read as text so that type inference
+# does not vary between CSV chunks (e.g. phone numbers parsed as floats).
+INPUT_NUMERIC_COLUMNS = ["job_id", "Jaar (van datum gevonden)", "Maand (van datum gevonden)"]
+RESPONSE_CACHE_PATH = WORKSPACE_DIR / "data" / "cache" / "llm_responses.sqlite"
+
+# Seconds between checks whether the context caches need a longer TTL.
+KEEPALIVE_INTERVAL = 60
+
+# Rough characters-per-token ratio used to estimate prompt size before a call.
+CHARS_PER_TOKEN = 4
+
+
+@dataclass
+class ExtractionContext:
+    """Everything shared by the workers of one extraction run."""
+
+    backend: LLMBackend
+    system_instruction: str
+    sink: JsonDirectorySink | AnalysisStore
+    failed_dir: Path = FAILED_DIR
+    delay: float = 0.0
+    rate_limiter: RateLimiter | None = None
+    concurrency: AdaptiveConcurrency | None = None
+    retry_policy: RetryPolicy | None = None
+    cache: ResponseCache | None = None
+    manifest: RunManifest | None = None
+    metrics: MetricsRecorder | None = None
+    # Single-ad instruction the per-ad response cache is keyed on. Batch runs
+    # keep it, so an ad answered in a batch is reused by single-ad runs and
+    # the other way around.
+    cache_instruction: str | None = None
+
+    def cache_key(self, job_text: str) -> str:
+        return make_cache_key(
+            self.backend.name,
+            GENERATION_CONFIG,
+            self.cache_instruction or self.system_instruction,
+            job_text,
+        )
+
 
 # --- Main Functions ---
 
 
-def get_analysis_prompt(coding_book, job_description):
-    """Creates the prompt for the Gemini API call."""
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate for rate limiting, reconciled with usage_metadata later."""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def instruction_digest(system_instruction: str) -> str:
+    """SHA-256 of a system instruction; identifies the cached prompt prefix."""
+    return hashlib.sha256(system_instruction.encode("utf-8")).hexdigest()
+
+
+def max_batch_size(output_tokens_per_ad: int = BATCH_OUTPUT_TOKENS_PER_AD) -> int:
+    """The most ads whose expected analyses fit in one response."""
+    return max(1, MAX_OUTPUT_TOKENS // output_tokens_per_ad)
+
+
+def batch_generation_config(
+    batch_size: int, output_tokens_per_ad: int = BATCH_OUTPUT_TOKENS_PER_AD
+) -> dict:
+    """
+    The generation config of batch mode: one tagged Analysis per job ad, with
+    the output limit scaled to the batch size and capped at the model's limit.
+    """
+    return {
+        **GENERATION_CONFIG,
+        "response_schema": list[BatchItem],
+        "max_output_tokens": min(MAX_OUTPUT_TOKENS, batch_size * output_tokens_per_ad),
+    }
+
+
+def get_system_instruction(coding_book):
+    """
+    Creates the static part of the prompt: the analyst instructions plus the Coding Book.
+
+    It is identical for every job ad, so it is sent once as the model's system
+    instruction (or context cache) instead of being repeated in every request.
+    """
     return f"""
     **Instructions for the Job Analyst:**
 
@@ -97,63 +202,276 @@ def get_analysis_prompt(coding_book, job_description):
     **Coding Book:**
 
     {coding_book}
+    """
 
-    ---
+
+def get_analysis_prompt(job_description):
+    """Creates the per-request prompt for the Gemini API call: only the job text."""
+    return f"""
     **Job Description to Analyze:**
 
     {job_description}
     """
 
 
+def get_batch_system_instruction(coding_book):
+    """The system instruction for batch mode: the usual one plus the batch output contract."""
+    header = BATCH_JOB_HEADER.format(job_id="<id>")
+    return (
+        get_system_instruction(coding_book)
+        + f"""
+    ---
+    **Batch Mode:**
+
+    You will receive several job descriptions in one message, each introduced by a
+    line `{header}`. Analyze every job description independently, exactly as you would
+    analyze it on its own. Return a JSON list with one object per job description,
+    containing its `job_id` and its `analysis`.
+    """
+    )
+
+
+def get_batch_prompt(jobs: List[dict]) -> str:
+    """Creates the per-request prompt for a batch: every job text under its JOB_ID header."""
+    sections = [
+        f"{BATCH_JOB_HEADER.format(job_id=job['job_id'])}\n\n{job['job_text']}"
+        for job in jobs
+    ]
+    return "**Job Descriptions to Analyze:**\n\n" + "\n\n---\n\n".join(sections)
+
+
+def get_context_cache(system_instruction: str, ttl_minutes: int) -> caching.CachedContent:
+    """
+    Returns a Gemini context cache holding the system instruction.
+
+    Caches are looked up by a display name derived from the hash of the full
+    instruction, so re-runs with unchanged instructions reuse the live cache,
+    while an edited coding book or instruction wording, and the batch-mode
+    instruction, each get their own.
+    """
+    display_name = f"instructions-{instruction_digest(system_instruction)[:16]}"
+    model_path = MODEL_NAME if MODEL_NAME.startswith("models/") else f"models/{MODEL_NAME}"
+    for cache in caching.CachedContent.list():
+        if cache.display_name == display_name and cache.model == model_path:
+            print(f"Reusing context cache {cache.name} ({display_name}).")
+            cache.update(ttl=datetime.timedelta(minutes=ttl_minutes))
+            return cache
+
+    cache = caching.CachedContent.create(
+        model=model_path,
+        display_name=display_name,
+        system_instruction=system_instruction,
+        ttl=datetime.timedelta(minutes=ttl_minutes),
+    )
+    print(f"Created context cache {cache.name} ({display_name}).")
+    return cache
+
+
+class ContextCacheKeeper:
+    """
+    Keeps the context caches of a run alive.
+
+    A cache expires `ttl_minutes` after it was created or last updated, while
+    a full run can take hours; `refresh` extends the TTL of every registered
+    cache once half of it has passed.
+    """
+
+    def __init__(self, ttl_minutes: int):
+        self.ttl = datetime.timedelta(minutes=ttl_minutes)
+        self.caches: List[caching.CachedContent] = []
+        self.refreshed_at = time.monotonic()
+
+    def add(self, cache: caching.CachedContent) -> None:
+        self.caches.append(cache)
+
+    def refresh(self) -> None:
+        if time.monotonic() - self.refreshed_at < self.ttl.total_seconds() / 2:
+            return
+        self.refreshed_at = time.monotonic()
+        for cache in self.caches:
+            try:
+                cache.update(ttl=self.ttl)
+            except Exception as e:
+                print(f"Could not extend context cache {cache.name}: {e}")
+
+
+def configure_gemini() -> None:
+    """Configures the Gemini SDK; only needed when the real API backend is used."""
+    api_key = os.getenv("GOOGLE_API_KEY")
+    if not api_key:
+        raise ValueError(
+            "GOOGLE_API_KEY not found in environment variables or .env file."
+        )
+    genai.configure(api_key=api_key)
+
+
+def create_model(
+    coding_book: str,
+    use_context_cache: bool = False,
+    cache_ttl_minutes: int = 60,
+    batch_size: int = 1,
+    output_tokens_per_ad: int = BATCH_OUTPUT_TOKENS_PER_AD,
+    cache_keeper: ContextCacheKeeper | None = None,
+) -> genai.GenerativeModel:
+    """
+    Builds the single GenerativeModel shared by all requests of a run.
+
+    The instructions and coding book are attached as a system instruction. With
+    `use_context_cache`, they are stored in a Gemini context cache instead so the
+    prefix is billed at the cached-token rate; if the cache cannot be created
+    (e.g. the model does not support caching or the prefix is below the minimum
+    cache size), the plain system instruction is used. With a `batch_size`
+    above 1, the model uses the batch instruction and list-of-analyses
+    response schema, with room for `output_tokens_per_ad` per ad. A context
+    cache is registered with `cache_keeper`, if given, to be kept alive.
+    """
+    if batch_size > 1:
+        system_instruction = get_batch_system_instruction(coding_book)
+        generation_config = batch_generation_config(batch_size, output_tokens_per_ad)
+    else:
+        system_instruction = get_system_instruction(coding_book)
+        generation_config = GENERATION_CONFIG
+
+    if use_context_cache:
+        try:
+            cache = get_context_cache(system_instruction, cache_ttl_minutes)
+            if cache_keeper is not None:
+                cache_keeper.add(cache)
+            return genai.GenerativeModel.from_cached_content(
+                cached_content=cache,
+                generation_config=generation_config,
+                safety_settings=SAFETY_SETTINGS,
+            )
+        except Exception as e:
+            print(f"Context cache unavailable ({e}); using a system instruction.")
+
+    return genai.GenerativeModel(
+        model_name=MODEL_NAME,
+        generation_config=generation_config,
+        safety_settings=SAFETY_SETTINGS,
+        system_instruction=system_instruction,
+    )
+
+
+def call_backend(
+    ctx: "ExtractionContext",
+    prompt: str,
+    description: str,
+    call: CallMetrics | None = None,
+) -> BackendResponse:
+    """
+    Sends one prompt through the rate limiter, concurrency limit and retry policy.
+
+    If `call` is given, throttling and network time (summed over retries), the
+    retry count and the reported token usage are added to it. Raises the last
+    error if the request could not be completed.
+    """
+    call = CallMetrics([]) if call is None else call
+    estimated_tokens = estimate_tokens(prompt)
+
+    def generate():
+        if ctx.rate_limiter is not None:
+            call.add_time("throttle", ctx.rate_limiter.acquire(estimated_tokens))
+        if ctx.concurrency is None:
+            with call.phase("network"):
+                return ctx.backend.generate(prompt)
+        with ctx.concurrency, call.phase("network"):
+            return ctx.backend.generate(prompt)
+
+    response, call.retries = call_with_retries(
+        generate, ctx.retry_policy or RetryPolicy(), ctx.concurrency, description
+    )
+    call.prompt_tokens = response.prompt_tokens
+    call.output_tokens = response.output_tokens
+    if ctx.rate_limiter is not None:
+        ctx.rate_limiter.record_usage(estimated_tokens, response.total_tokens)
+    return response
+
+
+def strip_code_fences(response_text: str) -> str:
+    """Removes a ```json ... ``` wrapper around a response, if present."""
+    if response_text.startswith("```json"):
+        response_text = response_text[7:]
+    if response_text.endswith("```"):
+        response_text = response_text[:-3]
+    return response_text
+
+
+def build_result(job_id: int, job_info: dict, analysis_data: dict) -> dict:
+    """Combines the original job info with the analysis into the stored record."""
+    return {
+        "job_id": job_id,
+        "job_details": {
+            k: (None if isinstance(v, float) and math.isnan(v) else v)
+            for k, v in job_info.items()
+        },
+        "analysis": analysis_data,
+    }
+
+
+def is_valid_analysis(analysis_data) -> bool:
+    """Minimal structural check used to accept individual items of a batch response."""
+    return (
+        isinstance(analysis_data, dict)
+        and isinstance(analysis_data.get("profile_classification"), dict)
+        and isinstance(analysis_data.get("thematic_analysis"), dict)
+    )
+
+
 def analyze_job_ad(
-    job_ad_text: str, template: str, job_id: int, job_info: dict
+    ctx: ExtractionContext,
+    job_ad_text: str,
+    template: str,
+    job_id: int,
+    job_info: dict,
+    call: CallMetrics | None = None,
 ) -> dict | None:
     """
     Analyzes a single job ad using the Gemini API.
 
+    A response cached for the same model, generation config, coding book and
+    ad text is reused without calling the API. Quota (429) and server (5xx)
+    errors are retried with jittered exponential backoff; only non-retryable
+    errors or exhausted retries abort the job.
+
     Args:
+        ctx: The shared model, throttling and cache settings of the run.
         job_ad_text: The full text of the job advertisement.
-        template: The full prompt template including the master prompt and coding book.
+        template: The per-request prompt containing the job description.
         job_id: The unique identifier for the job ad.
         job_info: A dictionary containing all original data for the job ad.
+        call: If given, receives the phase timings, token usage and any error.
 
     Returns:
         A dictionary containing the structured analysis from the API, or None on failure.
     """
-    model = genai.GenerativeModel(
-        model_name=MODEL_NAME,
-        generation_config=GENERATION_CONFIG,
-        safety_settings=SAFETY_SETTINGS,
-    )
-
     prompt = template
+    call = CallMetrics([job_id]) if call is None else call
+    cache_key = ctx.cache_key(job_ad_text) if ctx.cache is not None else None
+    cached_text = ctx.cache.get(cache_key) if cache_key is not None else None
+    call.cached = cached_text is not None
 
     try:
-        response = model.generate_content(prompt)
-
-        # Clean the response text before parsing
-        response_text = response.text
-        if response_text.startswith("```json"):
-            response_text = response_text[7:]
-        if response_text.endswith("```"):
-            response_text = response_text[:-3]
-
-        analysis_data = json.loads(response_text)
-
-        # Combine original job info with the new analysis
-        final_result = {
-            "job_id": job_id,
-            "job_details": {
-                k: (None if isinstance(v, float) and math.isnan(v) else v)
-                for k, v in job_info.items()
-            },
-            "analysis": analysis_data,
-        }
-        return final_result  # Success
+        if cached_text is not None:
+            response_text = cached_text
+        else:
+            response = call_backend(ctx, prompt, f"job {job_id}", call)
+            # Clean the response text before parsing
+            with call.phase("repair"):
+                response_text = strip_code_fences(response.text)
+
+        with call.phase("parse"):
+            analysis_data = json.loads(response_text)
+
+        if cached_text is None and cache_key is not None:
+            ctx.cache.put(cache_key, ctx.backend.name, response_text)
+
+        return build_result(job_id, job_info, analysis_data)  # Success
     except Exception as e:
         print(f"An error occurred for job {job_id}: {e}")
+        call.error = f"{type(e).__name__}: {e}"
         if "response" in locals() and hasattr(response, "text"):
-            failed_path = FAILED_DIR / f"failed_job_{job_id}.txt"
+            failed_path = ctx.failed_dir / f"failed_job_{job_id}.txt"
             with open(failed_path, "w", encoding="utf-8") as f:
                 f.write(response.text)
             print(f"Saved failed response to {failed_path}")
@@ -162,60 +480,735 @@ def analyze_job_ad(
         return None
 
 
-def main():
+def iter_pending_jobs(
+    input_path: Path,
+    skip_ids: Collection[int] = frozenset(),
+    defer_ids: Collection[int] = frozenset(),
+    chunksize: int = 256,
+    limit: int | None = None,
+    detail_columns: List[str] | None = None,
+) -> Iterator[dict]:
     """
-    Main function to run the analysis pipeline.
+    Streams the job ads that still need to be analyzed from the input dataset.
+
+    The CSV (or Parquet) file is read in chunks of `chunksize` rows, so memory stays flat and the
+    first request can start before the whole file has been parsed.
+
+    Args:
+        skip_ids: Jobs to leave out, e.g. those the run manifest lists as done
+            or as failed too often. They are dropped per chunk before the
+            prompt text and job details are built.
+        defer_ids: Jobs that failed before; they are held back and yielded
+            after all new jobs, so repeat failures do not hold up fresh work.
+        detail_columns: Columns stored as `job_details` next to the analysis;
+            None keeps all columns. Only these and the text columns are parsed.
     """
-    print("--- Starting Automated Job Ad Analysis ---")
+    columns = None
+    if detail_columns is not None:
+        columns = {"job_id", "Vacaturetitel", "Functieomschrijving", *detail_columns}
 
-    OUTPUT_DIR.mkdir(exist_ok=True)
-    FAILED_DIR.mkdir(exist_ok=True)
-    print(f"Output directory created/ensured at: {OUTPUT_DIR}")
-    print(f"Failed analysis directory created/ensured at: {FAILED_DIR}")
+    reader = iter_artifact_chunks(
+        input_path,
+        chunksize,
+        columns=columns,
+        nrows=limit,
+        dtype=defaultdict(lambda: str, {c: "int64" for c in INPUT_NUMERIC_COLUMNS}),
+    )
+    deferred: List[dict] = []
+    for chunk in reader:
+        if skip_ids:
+            chunk = chunk[~chunk["job_id"].isin(skip_ids)]
+        if chunk.empty:
+            continue
 
-    print("Loading coding book...")
-    with open(CODING_BOOK_PATH, "r", encoding="utf-8") as f:
-        coding_book = f.read()
+        # Parquet input keeps dates typed; store them as the text a CSV holds.
+        for column in chunk.select_dtypes(include="datetime").columns:
+            chunk[column] = chunk[column].astype(str).where(chunk[column].notna())
+
+        chunk = chunk.assign(
+            full_text=chunk["Vacaturetitel"].fillna("")
+            + "\n\n"
+            + chunk["Functieomschrijving"].fillna("")
+        )
 
-    print(f"Loading job data from: {INPUT_DATA_PATH}")
-    df = pd.read_csv(INPUT_DATA_PATH)
+        for job_info in chunk.to_dict("records"):
+            job_id = job_info["job_id"]
+            job_text = job_info["full_text"]
 
-    df["full_text"] = (
-        df["Vacaturetitel"].fillna("") + "\n\n" + df["Functieomschrijving"].fillna("")
+            if not job_text.strip():
+                print(f"Skipping job {job_id} due to empty text.")
+                continue
+
+            if detail_columns is not None:
+                job_info = {
+                    k: v
+                    for k, v in job_info.items()
+                    if k in detail_columns or k in ("job_id", "full_text")
+                }
+
+            job = {
+                "job_id": job_id,
+                "job_text": job_text,
+                "job_info": job_info,
+            }
+            if job_id in defer_ids:
+                deferred.append(job)
+            else:
+                yield job
+
+    if deferred:
+        print(f"Retrying {len(deferred)} previously failed job(s).")
+    yield from deferred
+
+
+def process_job(job: dict, ctx: ExtractionContext) -> bool:
+    """
+    Analyzes one pending job ad and saves the result as soon as it is available.
+
+    Returns:
+        True if the analysis was saved, False otherwise.
+    """
+    job_id = job["job_id"]
+    title = job["job_text"].split("\n", 1)[0]
+    print(f"\nAnalyzing job {job_id}: {title[:50]}...")
+
+    call = CallMetrics([job_id])
+    with call.phase("prompt_build"):
+        prompt = get_analysis_prompt(job["job_text"])
+
+    analysis_result = analyze_job_ad(
+        ctx, job["job_text"], prompt, job_id, job["job_info"], call
     )
 
-    print(f"Found {len(df)} total job ads to analyze.")
+    saved = False
+    if analysis_result:
+        with call.phase("write"):
+            call.bytes_written = ctx.sink.write(analysis_result)
+        print(f"Successfully saved analysis for job {job_id} to {ctx.sink.describe(job_id)}")
+        saved = True
+    else:
+        print(f"Skipping save for job {job_id} due to repeated failures.")
+    call.ok = saved
+
+    latency = time.perf_counter() - call.started
+    if ctx.metrics is not None:
+        ctx.metrics.record(call)
+    if ctx.manifest is not None:
+        if saved:
+            ctx.manifest.record_success(
+                job_id, latency, call.prompt_tokens, call.output_tokens
+            )
+        else:
+            ctx.manifest.record_failure(job_id, call.error, latency)
 
-    for index, row in tqdm(df.iterrows(), total=df.shape[0], desc="Analyzing Jobs"):
-        job_id = row["job_id"]
-        job_info = row.to_dict()
-        output_path = OUTPUT_DIR / f"analysis_job_{job_id}.json"
+    if ctx.delay:
+        time.sleep(ctx.delay)
+    return saved
 
-        if output_path.exists():
+
+def iter_batches(
+    jobs: Iterable[dict], batch_size: int, token_budget: int, max_ad_tokens: int
+) -> Iterator[List[dict]]:
+    """
+    Packs pending jobs into batches for batch-prompt mode.
+
+    Short ads (at most `max_ad_tokens`) are grouped, up to `batch_size` ads and
+    `token_budget` estimated prompt tokens per batch; longer ads are yielded as
+    single-job batches. Jobs are consumed lazily.
+    """
+    batch: List[dict] = []
+    batch_tokens = 0
+    for job in jobs:
+        tokens = estimate_tokens(job["job_text"])
+        if batch_size <= 1 or tokens > max_ad_tokens:
+            yield [job]
             continue
+        if batch and (len(batch) >= batch_size or batch_tokens + tokens > token_budget):
+            yield batch
+            batch, batch_tokens = [], 0
+        batch.append(job)
+        batch_tokens += tokens
+    if batch:
+        yield batch
+
+
+def process_batch(
+    batch: List[dict], ctx: ExtractionContext, batch_ctx: ExtractionContext
+) -> tuple[int, int]:
+    """
+    Analyzes several short job ads with a single request.
+
+    Cached ads are saved without a request; an unreadable cached response is
+    requested again with the rest of the batch. The response must be a list of
+    `{job_id, analysis}` items; every job whose item is missing or invalid, or
+    all jobs if the request or JSON parsing fails, is retried on its own with
+    the single-ad prompt.
+
+    Returns:
+        A tuple of (succeeded, failed) job counts.
+    """
+    if len(batch) == 1:
+        return (1, 0) if process_job(batch[0], ctx) else (0, 1)
+
+    call = CallMetrics([job["job_id"] for job in batch], kind="batch")
+    succeeded = failed = 0
+    pending: List[dict] = []
+    for job in batch:
+        cached_text = None
+        if batch_ctx.cache is not None:
+            cached_text = batch_ctx.cache.get(batch_ctx.cache_key(job["job_text"]))
+        if cached_text is not None:
+            try:
+                with call.phase("parse"):
+                    analysis_data = json.loads(cached_text)
+            except ValueError as e:
+                print(f"Ignoring unreadable cached response for job {job['job_id']} ({e}).")
+                cached_text = None
+        if cached_text is not None:
+            with call.phase("write"):
+                call.bytes_written += batch_ctx.sink.write(
+                    build_result(job["job_id"], job["job_info"], analysis_data)
+                )
+            if batch_ctx.manifest is not None:
+                batch_ctx.manifest.record_success(
+                    job["job_id"], time.perf_counter() - call.started
+                )
+            succeeded += 1
+        else:
+            pending.append(job)
+    call.cached = not pending
+    if not pending:
+        call.ok = True
+        if batch_ctx.metrics is not None:
+            batch_ctx.metrics.record(call)
+        batch_ids = ", ".join(str(job["job_id"]) for job in batch)
+        print(f"Saved {succeeded} cached analyses for batch [{batch_ids}].")
+        return succeeded, failed
+
+    job_ids = ", ".join(str(job["job_id"]) for job in pending)
+    print(f"\nAnalyzing batch of {len(pending)} jobs: {job_ids}...")
 
-        job_text = row["full_text"]
+    analyses: dict = {}
+    try:
+        with call.phase("prompt_build"):
+            prompt = get_batch_prompt(pending)
+        response = call_backend(batch_ctx, prompt, f"batch [{job_ids}]", call)
+        with call.phase("repair"):
+            response_text = strip_code_fences(response.text)
+        with call.phase("parse"):
+            items = json.loads(response_text)
+        for item in items if isinstance(items, list) else []:
+            if isinstance(item, dict) and is_valid_analysis(item.get("analysis")):
+                analyses[str(item.get("job_id"))] = item["analysis"]
+    except Exception as e:
+        call.error = f"{type(e).__name__}: {e}"
+        print(f"Batch [{job_ids}] failed ({e}); retrying its jobs one by one.")
 
-        if not job_text.strip():
-            print(f"Skipping job {job_id} due to empty text.")
+    # The batch's token usage is attributed evenly to the jobs it answered.
+    answered = sum(str(job["job_id"]) in analyses for job in pending)
+    per_job_prompt_tokens = per_job_output_tokens = None
+    if answered and call.prompt_tokens is not None:
+        per_job_prompt_tokens = call.prompt_tokens // answered
+    if answered and call.output_tokens is not None:
+        per_job_output_tokens = call.output_tokens // answered
+
+    fallback: List[dict] = []
+    saved = 0
+    for job in pending:
+        analysis_data = analyses.get(str(job["job_id"]))
+        if analysis_data is None:
+            fallback.append(job)
             continue
+        with call.phase("write"):
+            call.bytes_written += batch_ctx.sink.write(
+                build_result(job["job_id"], job["job_info"], analysis_data)
+            )
+        if batch_ctx.manifest is not None:
+            batch_ctx.manifest.record_success(
+                job["job_id"],
+                time.perf_counter() - call.started,
+                per_job_prompt_tokens,
+                per_job_output_tokens,
+            )
+        if batch_ctx.cache is not None:
+            batch_ctx.cache.put(
+                batch_ctx.cache_key(job["job_text"]),
+                batch_ctx.backend.name,
+                json.dumps(analysis_data, ensure_ascii=False),
+            )
+        saved += 1
+    succeeded += saved
+
+    call.ok = call.error is None
+    if batch_ctx.metrics is not None:
+        batch_ctx.metrics.record(call)
 
-        print(f"\nAnalyzing job {job_id}: {row['Vacaturetitel'][:50]}...")
+    for job in fallback:
+        if process_job(job, ctx):
+            succeeded += 1
+        else:
+            failed += 1
 
-        prompt = get_analysis_prompt(coding_book, job_text)
+    if saved:
+        print(f"Saved {saved} analyses from batch [{job_ids}].")
+    if ctx.delay:
+        time.sleep(ctx.delay)
+    return succeeded, failed
+
+
+def run_jobs(
+    jobs: Iterable,
+    worker: Callable[..., tuple[int, int]],
+    concurrency: int,
+    total: int | None = None,
+    keepalive: Callable[[], None] | None = None,
+) -> tuple[int, int]:
+    """
+    Runs `worker` over `jobs` with at most `concurrency` calls in flight.
+
+    Jobs (single ads or batches) are pulled lazily from the iterable, so only
+    `concurrency` of them are materialized at any time and wall-clock time
+    scales with the in-flight limit rather than with the number of ads. The
+    worker returns the (succeeded, failed) job counts of its unit of work.
+    `keepalive`, if given, is called at least every KEEPALIVE_INTERVAL
+    seconds, e.g. to extend the context caches of a long run.
+
+    Returns:
+        A tuple of (succeeded, failed) job counts.
+    """
+    succeeded = failed = 0
+    job_iter = iter(jobs)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor, tqdm(
+        total=total, desc="Analyzing Jobs"
+    ) as progress:
+        in_flight = set()
+
+        def fill() -> None:
+            while len(in_flight) < concurrency:
+                job = next(job_iter, None)
+                if job is None:
+                    return
+                in_flight.add(executor.submit(worker, job))
+
+        fill()
+        while in_flight:
+            done, _ = wait(
+                in_flight, timeout=KEEPALIVE_INTERVAL, return_when=FIRST_COMPLETED
+            )
+            if keepalive is not None:
+                keepalive()
+            for future in done:
+                in_flight.remove(future)
+                try:
+                    done_ok, done_failed = future.result()
+                except Exception as e:
+                    print(f"Unexpected worker error: {e}")
+                    done_ok, done_failed = 0, 1
+                succeeded += done_ok
+                failed += done_failed
+                progress.update(done_ok + done_failed)
+            fill()
+
+    return succeeded, failed
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Analyze job ads with the Gemini API based on the coding book.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "--backend",
+        choices=["gemini", "mock"],
+        default="gemini",
+        help="LLM backend; 'mock' returns offline, schema-valid analyses for load tests.",
+    )
+    parser.add_argument(
+        "--output-dir",
+        type=Path,
+        default=OUTPUT_DIR,
+        help="Directory for analysis_job_{id}.json files (failed responses go to failed/).",
+    )
+    parser.add_argument(
+        "--sink",
+        choices=["json", "jsonl"],
+        default="json",
+        help="Write one JSON file per job, or append to the sharded JSONL store.",
+    )
+    parser.add_argument(
+        "--store-dir",
+        type=Path,
+        default=STORE_DIR,
+        help="Directory of the append-only JSONL store used with --sink jsonl.",
+    )
+    parser.add_argument(
+        "--limit",
+        type=int,
+        default=None,
+        help="Only analyze the first N job ads of the input.",
+    )
+    parser.add_argument(
+        "--chunksize",
+        type=int,
+        default=256,
+        help="Rows read from the input CSV at a time.",
+    )
+    parser.add_argument(
+        "--detail-columns",
+        nargs="+",
+        default=None,
+        help="Input columns stored as job_details with each analysis (default: all).",
+    )
+    parser.add_argument(
+        "--mock-latency",
+        type=float,
+        default=0.5,
+        help="Mean simulated latency in seconds of the mock backend.",
+    )
+    parser.add_argument(
+        "--mock-latency-jitter",
+        type=float,
+        default=0.25,
+        help="Uniform +/- jitter in seconds added to the mock latency.",
+    )
+    parser.add_argument(
+        "--mock-error-rate",
+        type=float,
+        default=0.0,
+        help="Fraction of mock calls failing with a retryable 429/503 error.",
+    )
+    parser.add_argument(
+        "--mock-malformed-rate",
+        type=float,
+        default=0.0,
+        help="Fraction of mock responses returned as truncated, invalid JSON.",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=None,
+        help="Random seed for the mock backend.",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=1,
+        help="Maximum number of job ads analyzed in parallel (in-flight API calls).",
+    )
+    parser.add_argument(
+        "--delay",
+        type=float,
+        default=None,
+        help="Seconds each worker waits after a request before taking the next job "
+        "(default: 0.5, or 0 when --rpm/--tpm budgets are set).",
+    )
+    parser.add_argument(
+        "--rpm",
+        type=float,
+        default=0,
+        help="Requests-per-minute budget (0 disables the limit).",
+    )
+    parser.add_argument(
+        "--tpm",
+        type=float,
+        default=0,
+        help="Tokens-per-minute budget (0 disables the limit).",
+    )
+    parser.add_argument(
+        "--max-retries",
+        type=int,
+        default=6,
+        help="Retries for 429/5xx errors before a job is given up.",
+    )
+    parser.add_argument(
+        "--backoff-base",
+        type=float,
+        default=2.0,
+        help="Base delay in seconds for jittered exponential backoff.",
+    )
+    parser.add_argument(
+        "--backoff-max",
+        type=float,
+        default=60.0,
+        help="Maximum backoff delay in seconds.",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=1,
+        help="Maximum number of short job ads packed into one request (1 disables "
+        "batching). Capped so that the expected output of every ad fits in one response.",
+    )
+    parser.add_argument(
+        "--batch-output-tokens",
+        type=int,
+        default=BATCH_OUTPUT_TOKENS_PER_AD,
+        help="Expected output tokens per ad in batch mode; sets the batch size cap "
+        f"({MAX_OUTPUT_TOKENS} output tokens per response, see GEMINI_MAX_OUTPUT_TOKENS).",
+    )
+    parser.add_argument(
+        "--batch-token-budget",
+        type=int,
+        default=6000,
+        help="Maximum estimated prompt tokens of job text per batched request.",
+    )
+    parser.add_argument(
+        "--batch-max-ad-tokens",
+        type=int,
+        default=800,
+        help="Only ads up to this many estimated tokens are batched; longer ads go alone.",
+    )
+    parser.add_argument(
+        "--context-cache",
+        action="store_true",
+        help="Store the instructions and coding book in a Gemini context cache "
+        "keyed by the instruction hash instead of a plain system instruction.",
+    )
+    parser.add_argument(
+        "--cache-ttl",
+        type=int,
+        default=60,
+        help="Lifetime in minutes of the Gemini context cache; extended during long runs.",
+    )
+    parser.add_argument(
+        "--response-cache",
+        type=Path,
+        default=RESPONSE_CACHE_PATH,
+        help="SQLite file caching responses by model, config, coding book and ad text.",
+    )
+    parser.add_argument(
+        "--no-response-cache",
+        action="store_true",
+        help="Disable the on-disk response cache.",
+    )
+    parser.add_argument(
+        "--cache-max-mb",
+        type=float,
+        default=500,
+        help="Size limit of the response cache; least recently used entries are evicted.",
+    )
+    parser.add_argument(
+        "--cache-stats",
+        action="store_true",
+        help="Print response cache statistics and exit.",
+    )
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Re-analyze jobs even if their output file exists (cache hits are free).",
+    )
+    parser.add_argument(
+        "--manifest",
+        type=Path,
+        default=None,
+        help="SQLite run manifest tracking per-job status, attempts, latency and tokens "
+        "(default: run_manifest.sqlite in the output or store directory).",
+    )
+    parser.add_argument(
+        "--max-attempts",
+        type=int,
+        default=3,
+        help="Skip jobs that already failed this many times (0 retries them forever).",
+    )
+    parser.add_argument(
+        "--metrics-file",
+        type=Path,
+        default=None,
+        help="JSONL file receiving per-call phase timings, tokens, retries and bytes "
+        "(default: metrics/<run_id>.jsonl next to the run manifest).",
+    )
+    parser.add_argument(
+        "--input-price",
+        type=float,
+        default=None,
+        help="Price per million prompt tokens, used to estimate the run's cost.",
+    )
+    parser.add_argument(
+        "--output-price",
+        type=float,
+        default=None,
+        help="Price per million output tokens, used to estimate the run's cost.",
+    )
+    return parser.parse_args()
 
-        analysis_result = analyze_job_ad(job_text, prompt, job_id, job_info)
 
-        if analysis_result:
-            with open(output_path, "w", encoding="utf-8") as f:
-                json.dump(analysis_result, f, ensure_ascii=False, indent=4)
+def main():
+    """
+    Main function to run the analysis pipeline.
+    """
+    args = parse_args()
+    if args.concurrency < 1:
+        raise ValueError("--concurrency must be at least 1.")
+    batch_cap = max_batch_size(args.batch_output_tokens)
+    if args.batch_size > batch_cap:
+        print(
+            f"Reducing --batch-size from {args.batch_size} to {batch_cap}: the expected "
+            f"output of {args.batch_output_tokens} tokens per ad must fit in "
+            f"{MAX_OUTPUT_TOKENS} output tokens, or batches get truncated and retried "
+            "one ad at a time."
+        )
+        args.batch_size = batch_cap
 
-            print(f"Successfully saved analysis for job {job_id} to {output_path}")
+    cache = None
+    if not args.no_response_cache:
+        cache = ResponseCache(args.response_cache, int(args.cache_max_mb * 1e6))
+    if args.cache_stats:
+        if cache is None:
+            print("The response cache is disabled.")
         else:
-            print(f"Skipping save for job {job_id} due to repeated failures.")
+            cache.print_stats()
+        return
+
+    print("--- Starting Automated Job Ad Analysis ---")
+
+    output_dir = args.output_dir
+    failed_dir = output_dir / "failed"
+    output_dir.mkdir(parents=True, exist_ok=True)
+    failed_dir.mkdir(exist_ok=True)
+    print(f"Output directory created/ensured at: {output_dir}")
+    print(f"Failed analysis directory created/ensured at: {failed_dir}")
+    if args.sink == "jsonl":
+        sink = AnalysisStore(args.store_dir)
+        print(f"Appending results to the JSONL store at: {args.store_dir}")
+        manifest_path = args.manifest or args.store_dir / "run_manifest.sqlite"
+    else:
+        sink = JsonDirectorySink(output_dir)
+        manifest_path = args.manifest or output_dir / "run_manifest.sqlite"
 
-        time.sleep(0.5)
+    manifest = RunManifest(manifest_path)
+    manifest.sync_with_sink(sink.job_ids())
+    manifest.start_run(f"backend={args.backend} sink={args.sink} concurrency={args.concurrency}")
+    print(f"Tracking job status in the run manifest at: {manifest_path}")
+    metrics_path = args.metrics_file or (
+        manifest_path.parent / "metrics" / f"{manifest.run_id}.jsonl"
+    )
+    metrics = MetricsRecorder(metrics_path, args.input_price, args.output_price)
+    print(f"Writing per-call metrics to: {metrics_path}")
+
+    print("Loading coding book...")
+    with open(CODING_BOOK_PATH, "r", encoding="utf-8") as f:
+        coding_book = f.read()
+
+    batch_backend = cache_keeper = None
+    if args.backend == "mock":
+        backend = MockBackend(
+            latency=args.mock_latency,
+            latency_jitter=args.mock_latency_jitter,
+            error_rate=args.mock_error_rate,
+            malformed_rate=args.mock_malformed_rate,
+            seed=args.seed,
+        )
+        batch_backend = backend
+    else:
+        configure_gemini()
+        cache_keeper = ContextCacheKeeper(args.cache_ttl)
+        backend = GeminiBackend(
+            create_model(
+                coding_book, args.context_cache, args.cache_ttl, cache_keeper=cache_keeper
+            ),
+            MODEL_NAME,
+        )
+        if args.batch_size > 1:
+            batch_backend = GeminiBackend(
+                create_model(
+                    coding_book,
+                    args.context_cache,
+                    args.cache_ttl,
+                    batch_size=args.batch_size,
+                    output_tokens_per_ad=args.batch_output_tokens,
+                    cache_keeper=cache_keeper,
+                ),
+                MODEL_NAME,
+            )
+    print(f"Using the '{backend.name}' backend.")
+
+    print(f"Streaming job data from: {INPUT_DATA_PATH}")
+
+    print(f"Running with up to {args.concurrency} request(s) in flight.")
+
+    delay = args.delay
+    if delay is None:
+        delay = 0.0 if (args.rpm or args.tpm) else 0.5
+    ctx = ExtractionContext(
+        backend=backend,
+        system_instruction=get_system_instruction(coding_book),
+        cache_instruction=get_system_instruction(coding_book),
+        sink=sink,
+        failed_dir=failed_dir,
+        delay=delay,
+        rate_limiter=RateLimiter(args.rpm, args.tpm),
+        concurrency=AdaptiveConcurrency(args.concurrency),
+        retry_policy=RetryPolicy(args.max_retries, args.backoff_base, args.backoff_max),
+        cache=cache,
+        manifest=manifest,
+        metrics=metrics,
+    )
+
+    failed_attempts = manifest.failed_attempts()
+    given_up = {
+        job_id
+        for job_id, attempts in failed_attempts.items()
+        if args.max_attempts and attempts >= args.max_attempts
+    }
+    if given_up:
+        print(
+            f"Skipping {len(given_up)} job(s) that failed {args.max_attempts} or more times "
+            "(raise --max-attempts to retry them)."
+        )
+    skip_ids = given_up if args.refresh else manifest.done_ids() | given_up
+    pending_jobs = iter_pending_jobs(
+        INPUT_DATA_PATH,
+        skip_ids=skip_ids,
+        defer_ids=set(failed_attempts) - given_up,
+        chunksize=args.chunksize,
+        limit=args.limit,
+        detail_columns=args.detail_columns,
+    )
+    keepalive = cache_keeper.refresh if cache_keeper is not None else None
+    if args.batch_size > 1:
+        print(
+            f"Batching up to {args.batch_size} short ads "
+            f"(<= {args.batch_max_ad_tokens} tokens) per request."
+        )
+        batch_ctx = replace(
+            ctx,
+            backend=batch_backend,
+            system_instruction=get_batch_system_instruction(coding_book),
+        )
+        succeeded, failed = run_jobs(
+            iter_batches(
+                pending_jobs,
+                args.batch_size,
+                args.batch_token_budget,
+                args.batch_max_ad_tokens,
+            ),
+            lambda batch: process_batch(batch, ctx, batch_ctx),
+            concurrency=args.concurrency,
+            keepalive=keepalive,
+        )
+    else:
+        succeeded, failed = run_jobs(
+            pending_jobs,
+            lambda job: (1, 0) if process_job(job, ctx) else (0, 1),
+            concurrency=args.concurrency,
+            keepalive=keepalive,
+        )
 
+    print(f"\nSaved {succeeded} new analyses; {failed} job(s) failed.")
+    manifest.finish_run()
+    manifest.print_summary()
+    manifest.close()
+    metrics.print_summary()
+    metrics.close()
+    if cache is not None:
+        evicted = cache.evict()
+        if evicted:
+            print(f"Evicted {evicted} least recently used cache entries.")
+        cache.print_stats()
+        cache.close()
+    if isinstance(sink, AnalysisStore):
+        sink.close()
     print("\n--- Automated Analysis Complete ---")
 
 
@@ -3,6 +3,8 @@ import seaborn as sns
 import matplotlib.pyplot as plt
 from pathlib import Path
 
+from artifacts import read_artifact
+
 # --- Configuration ---
 WORKSPACE_DIR = Path(__file__).resolve().parent.parent
 DATA_DIR = WORKSPACE_DIR / "data"
@@ -20,7 +22,7 @@ def analyze_topics_by_profile():
     to visualize the relationship between them.
     """
     print("Loading datasets...")
-    profiles_df = pd.read_csv(INPUT_PROFILES_CSV)
+    profiles_df = read_artifact(INPUT_PROFILES_CSV, columns=["job_id", "profile"])
     topic_mapping_df = pd.read_csv(INPUT_TOPIC_MAPPING_CSV)
     topic_defs_df = pd.read_csv(INPUT_TOPIC_DEFS_CSV)
 
@@ -34,9 +36,8 @@ def analyze_topics_by_profile():
     topic_labels = topic_defs_df.set_index("topic_id")["short_label"].to_dict()
 
     print("Merging dataframes...")
-    # The topic mapping is based on the index of the original dataframe, which corresponds to job_id
-    # Ensure job_id is of the same type if merging directly
-    # The topic modeling script saves the index as job_id, so a direct merge should work.
+    # The topic modeling script saves the job_id column of the deduplicated data,
+    # so a direct merge should work.
     merged_df = pd.merge(profiles_df, topic_mapping_df, on="job_id", how="inner")
 
     # Filter out ambiguous profiles for a clearer analysis
@@ -0,0 +1,210 @@
+"""Reading and writing the pipeline's intermediate datasets as CSV or Parquet."""
+
+import os
+from pathlib import Path
+from typing import Dict, Iterator, List
+
+import pandas as pd
+
+FORMATS = ["csv", "parquet"]
+SUFFIXES = {"csv": ".csv", "parquet": ".parquet"}
+
+# Low-cardinality text columns, stored dictionary-encoded and loaded as categoricals.
+CATEGORICAL_COLUMNS = [
+    "category_type",
+    "category_name",
+    "profile",
+    "Type adverteerder",
+    "Beroep",
+    "Beroepsgroep",
+    "Beroepsklasse",
+    "Opleidingsniveau",
+    "Contracttype",
+    "Parttime / fulltime",
+    "Branche",
+    "Organisatiegrootte",
+]
+INTEGER_COLUMNS = ["job_id", "Jaar (van datum gevonden)", "Maand (van datum gevonden)"]
+
+
+def artifact_dtypes(columns: List[str] | None = None) -> Dict[str, str]:
+    """The explicit dtypes of the known columns, optionally limited to `columns`."""
+    dtypes = {column: "category" for column in CATEGORICAL_COLUMNS}
+    dtypes.update({column: "int64" for column in INTEGER_COLUMNS})
+    if columns is not None:
+        dtypes = {k: v for k, v in dtypes.items() if k in columns}
+    return dtypes
+
+
+def artifact_path(path: Path, fmt: str) -> Path:
+    """`path` with the file suffix of format `fmt`."""
+    return Path(path).with_suffix(SUFFIXES[fmt])
+
+
+def artifact_format(path: Path) -> str:
+    return "parquet" if Path(path).suffix == ".parquet" else "csv"
+
+
+def resolve_artifact(path: Path) -> Path:
+    """
+    Returns the existing copy of an artifact, whichever format it was written in.
+
+    If both a CSV and a Parquet copy exist, the more recently written one wins.
+    If neither exists, `path` is returned unchanged.
+    """
+    candidates = [artifact_path(path, fmt) for fmt in FORMATS]
+    existing = [p for p in candidates if p.exists()]
+    if not existing:
+        return Path(path)
+    return max(existing, key=lambda p: p.stat().st_mtime_ns)
+
+
+def read_artifact(path: Path, columns: List[str] | None = None) -> pd.DataFrame:
+    """
+    Loads an artifact with explicit dtypes, reading only `columns` if given.
+
+    Known low-cardinality columns are returned as categoricals and id/year
+    columns as integers, regardless of the format on disk.
+    """
+    path = resolve_artifact(path)
+    if artifact_format(path) == "parquet":
+        # Parquet files written by `write_artifact` already carry these types.
+        return pd.read_parquet(path, columns=columns)
+    return pd.read_csv(path, usecols=columns, dtype=artifact_dtypes(columns))
+
+
+def iter_artifact_chunks(
+    path: Path,
+    chunksize: int,
+    columns: List[str] | None = None,
+    nrows: int | None = None,
+    dtype=None,
+) -> Iterator[pd.DataFrame]:
+    """
+    Streams an artifact in chunks of `chunksize` rows.
+
+    Columns in `columns` that the file does not have are ignored. `dtype`
+    only applies to CSV input; Parquet files carry their own types.
+    """
+    path = resolve_artifact(path)
+    if artifact_format(path) == "csv":
+        usecols = None if columns is None else (lambda column: column in columns)
+        yield from pd.read_csv(
+            path, chunksize=chunksize, nrows=nrows, usecols=usecols, dtype=dtype
+        )
+        return
+
+    import pyarrow.parquet as pq
+
+    remaining = nrows
+    parquet_file = pq.ParquetFile(path)
+    if columns is not None:
+        columns = [c for c in parquet_file.schema_arrow.names if c in columns]
+    for batch in parquet_file.iter_batches(batch_size=chunksize, columns=columns):
+        chunk = batch.to_pandas()
+        if remaining is not None:
+            chunk = chunk.iloc[:remaining]
+            remaining -= len(chunk)
+        if not chunk.empty:
+            yield chunk
+        if remaining is not None and remaining <= 0:
+            return
+
+
+def prepare_for_parquet(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Applies the explicit dtypes and makes object columns storable by Arrow.
+
+    Object columns mixing numbers and text (e.g. phone numbers) are stored as
+    text, the same representation a CSV round trip produces.
+    """
+    df = df.copy()
+    for column in df.columns:
+        values = df[column]
+        if values.dtype != object:
+            continue
+        kinds = {type(v) for v in values.dropna()}
+        if len(kinds) > 1:
+            df[column] = values.map(lambda v: v if pd.isna(v) else str(v))
+    categoricals = [
+        c for c in CATEGORICAL_COLUMNS if c in df.columns and df[c].dtype == object
+    ]
+    return df.astype({c: "category" for c in categoricals})
+
+
+class ArtifactWriter:
+    """
+    Writes an artifact chunk by chunk, for outputs that do not fit in memory.
+
+    All chunks must have the same columns. The file appears under its final
+    name only when `close` is called.
+    """
+
+    def __init__(self, path: Path, fmt: str | None = None):
+        self.fmt = fmt or artifact_format(path)
+        self.path = artifact_path(path, self.fmt)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        self.rows = 0
+        self.parquet_writer = None
+        self.schema = None
+        if self.fmt == "csv":
+            self.tmp_path.unlink(missing_ok=True)
+
+    def write(self, chunk: pd.DataFrame) -> None:
+        if self.fmt == "csv":
+            chunk.to_csv(
+                self.tmp_path,
+                mode="a",
+                header=self.rows == 0,
+                index=False,
+                encoding="utf-8",
+            )
+        else:
+            self._write_parquet(chunk)
+        self.rows += len(chunk)
+
+    def _write_parquet(self, chunk: pd.DataFrame) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.Table.from_pandas(prepare_for_parquet(chunk), preserve_index=False)
+        if self.schema is None:
+            # Fix one schema for all chunks: dictionary indices wide enough for
+            # any number of categories, and text for columns empty in chunk one.
+            fields = []
+            for field in table.schema:
+                if pa.types.is_dictionary(field.type):
+                    field = field.with_type(pa.dictionary(pa.int32(), field.type.value_type))
+                elif pa.types.is_null(field.type):
+                    field = field.with_type(pa.string())
+                fields.append(field)
+            self.schema = pa.schema(fields, metadata=table.schema.metadata)
+            self.parquet_writer = pq.ParquetWriter(self.tmp_path, self.schema)
+        self.parquet_writer.write_table(table.cast(self.schema))
+
+    def close(self) -> Path:
+        if self.parquet_writer is not None:
+            self.parquet_writer.close()
+        if self.tmp_path.exists():
+            os.replace(self.tmp_path, self.path)
+        return self.path
+
+
+def write_artifact(df: pd.DataFrame, path: Path, fmt: str | None = None) -> Path:
+    """
+    Writes `df` as CSV or Parquet and returns the path written.
+
+    The suffix of `path` is replaced to match `fmt`; without `fmt`, the format
+    follows the suffix. Files are written via a temporary file and a rename.
+    """
+    fmt = fmt or artifact_format(path)
+    path = artifact_path(path, fmt)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    if fmt == "parquet":
+        prepare_for_parquet(df).to_parquet(tmp_path, index=False)
+    else:
+        df.to_csv(tmp_path, index=False, encoding="utf-8")
+    os.replace(tmp_path, path)
+    return path
@@ -3,69 +3,98 @@ import re
 import argparse
 from pathlib import Path
 
+from artifacts import FORMATS, artifact_format, read_artifact, resolve_artifact, write_artifact
 
-def clean_consolidated_file(input_file: Path, output_file: Path):
+
+# Prefixes like 'TASK1: ', 'SKILL2: ', etc.
+CATEGORY_PREFIX = re.compile(r"^[A-Z]+\d*:\s*")
+# Entries that are just prefixes like 'TASK1', 'TECH', 'SKILL2'.
+BARE_CATEGORY_PREFIX = re.compile(r"^(TASK|SKILL|TECH)\d*$", flags=re.IGNORECASE)
+# Specific known messy values.
+CATEGORY_NAME_FIXES = {
+    "Communication & Communication": "Communication & Collaboration",
+}
+
+
+def clean_category_name(name: str) -> str | None:
+    """All category_name rules applied to one value; None if nothing is left."""
+    name = CATEGORY_PREFIX.sub("", name)
+    name = BARE_CATEGORY_PREFIX.sub("", name).strip()
+    if not name:
+        return None
+    return CATEGORY_NAME_FIXES.get(name, name)
+
+
+def clean_profile(profile: str) -> str:
+    """Removes backticks and standardizes whitespace."""
+    return profile.replace("`", "").strip()
+
+
+def clean_labels(values: pd.Series, clean) -> pd.Series:
     """
-    Cleans the category_name column in the consolidated CSV file.
-    This is a more robust version that handles multiple patterns.
+    Applies `clean` once per distinct value of `values` and broadcasts the
+    results back through categorical codes, so the cost scales with the
+    number of labels rather than rows. Missing values stay missing.
     """
-    if not input_file.exists():
-        print(f"Error: Consolidated input file not found at {input_file}")
-        return
+    if not isinstance(values.dtype, pd.CategoricalDtype):
+        values = values.astype("category")
+    cleaned = [clean(str(label)) for label in values.cat.categories]
+    # The code -1 of missing values picks the trailing None.
+    codes, categories = pd.factorize(pd.Series(cleaned + [None], dtype=object))
+    return pd.Series(
+        pd.Categorical.from_codes(codes[values.cat.codes.to_numpy()], categories),
+        index=values.index,
+        name=values.name,
+    )
 
-    print(f"Reading consolidated data from {input_file}...")
-    df = pd.read_csv(input_file)
 
-    # Ensure category_name is workable
-    names = df["category_name"].astype(str).copy()
+def clean_consolidated(df: pd.DataFrame) -> pd.DataFrame:
+    """The tidy analysis dataset with its category_name column cleaned."""
+    return df.assign(category_name=clean_labels(df["category_name"], clean_category_name))
 
-    # 1. Strip prefixes like 'TASK1: ', 'SKILL2: ', etc.
-    names = names.str.replace(r"^[A-Z]+\d*:\s*", "", regex=True)
 
-    # 2. Nullify entries that are just prefixes like 'TASK1', 'TECH', 'SKILL2'
-    # This is more robust and case-insensitive.
-    names = names.str.replace(
-        r"^(TASK|SKILL|TECH)\d*$", "", regex=True, flags=re.IGNORECASE
-    )
+def clean_profiles(df: pd.DataFrame) -> pd.DataFrame:
+    """The profiles dataset with its profile column cleaned."""
+    return df.assign(profile=clean_labels(df["profile"], clean_profile))
 
-    # 3. Strip any leading/trailing whitespace
-    names = names.str.strip()
 
-    # 4. Replace empty strings with NA so they are treated as nulls
-    names.replace("", pd.NA, inplace=True)
+def clean_consolidated_file(
+    input_file: Path, output_file: Path, output_format: str | None = None
+):
+    """
+    Cleans the category_name column in the consolidated CSV or Parquet file.
+    The output keeps the input's format unless `output_format` is given.
+    """
+    input_file = resolve_artifact(input_file)
+    if not input_file.exists():
+        print(f"Error: Consolidated input file not found at {input_file}")
+        return
 
-    # 5. Handle specific known messy values if any
-    names.replace(
-        "Communication & Communication", "Communication & Collaboration", inplace=True
+    print(f"Reading consolidated data from {input_file}...")
+    df = clean_consolidated(read_artifact(input_file))
+    output_file = write_artifact(
+        df, output_file, output_format or artifact_format(input_file)
     )
-
-    df["category_name"] = names
-    df.to_csv(output_file, index=False, encoding="utf-8")
     print(f"Cleaned consolidated data saved to {output_file}")
 
 
-def clean_profiles_file(input_file: Path, output_file: Path):
+def clean_profiles_file(
+    input_file: Path, output_file: Path, output_format: str | None = None
+):
     """
-    Cleans the profile column in the profiles CSV file.
+    Cleans the profile column in the profiles CSV or Parquet file.
     Removes backticks and standardizes whitespace.
     """
+    input_file = resolve_artifact(input_file)
     if not input_file.exists():
         print(f"Error: Profiles input file not found at {input_file}")
         return
 
     print(f"Reading profiles data from {input_file}...")
-    df = pd.read_csv(input_file)
-
-    profiles = df["profile"].astype(str).copy()
-
-    # Remove backticks
-    profiles = profiles.str.replace("`", "", regex=False)
-
-    # Standardize whitespace
-    profiles = profiles.str.strip()
-
-    df["profile"] = profiles
-    df.to_csv(output_file, index=False, encoding="utf-8")
+    df = clean_profiles(read_artifact(input_file))
+    output_file = write_artifact(
+        df, output_file, output_format or artifact_format(input_file)
+    )
     print(f"Cleaned profiles data saved to {output_file}")
 
 
@@ -94,11 +123,18 @@ def main():
         default=default_profiles,
         help="Path to the profiles CSV file.",
     )
+    parser.add_argument(
+        "--format",
+        choices=FORMATS,
+        default=None,
+        help="Output format (default: the format the input was read in). "
+        "The newest .csv/.parquet copy of each input is read.",
+    )
 
     args = parser.parse_args()
 
-    clean_consolidated_file(args.consolidated_file, args.consolidated_file)
-    clean_profiles_file(args.profiles_file, args.profiles_file)
+    clean_consolidated_file(args.consolidated_file, args.consolidated_file, args.format)
+    clean_profiles_file(args.profiles_file, args.profiles_file, args.format)
 
 
 if __name__ == "__main__":
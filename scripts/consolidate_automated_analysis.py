@@ -1,16 +1,54 @@
 import os
+import argparse
 import json
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterator, List, Tuple
 
 import pandas as pd
 
+from analysis_schemas import category_type as thematic_category_type
+from analysis_schemas import detect_schema, schema_report
+from analysis_store import AnalysisStore
+from artifacts import FORMATS, write_artifact
+from clean_analysis_output import clean_consolidated, clean_profiles
+from consolidation_cache import ConsolidationCache
 
 WORKSPACE_DIR = Path(__file__).resolve().parent.parent
 INPUT_DIR = WORKSPACE_DIR / "data" / "automated_analysis"
+INPUT_STORE_DIR = WORKSPACE_DIR / "data" / "automated_analysis_store"
 OUTPUT_TIDY_CSV = WORKSPACE_DIR / "data" / "automated_analysis_consolidated.csv"
 OUTPUT_PROFILES_CSV = WORKSPACE_DIR / "data" / "automated_analysis_profiles.csv"
 OUTPUT_PER_JOB_CSV = WORKSPACE_DIR / "data" / "automated_analysis_per_job.csv"
+OUTPUT_REJECTS_CSV = WORKSPACE_DIR / "data" / "automated_analysis_rejects.csv"
+CACHE_DIR = WORKSPACE_DIR / "data" / "cache" / "consolidation"
+WORKERS = os.cpu_count() or 1
+BATCH_SIZE = 256
+# Bump when the flattening (here or in analysis_schemas) changes the rows
+# produced for a file, to invalidate the rows cached by --incremental.
+FLATTEN_VERSION = 1
+
+TIDY_COLUMNS = [
+    "job_id",
+    "category_type",
+    "category_id",
+    "category_name",
+    "phrase",
+    "tool_name",
+    "justification",
+]
+PROFILE_COLUMNS = ["job_id", "profile", "confidence", "rationale"]
+JSON_COLUMNS = ["job_tasks", "technologies", "soft_skills"]
+PER_JOB_COLUMNS = PROFILE_COLUMNS + JSON_COLUMNS
+FILE_COLUMNS = ["source_file", "job_id", "schema"]
+REJECT_COLUMNS = ["source_file", "job_id", "reason"]
+TABLE_COLUMNS = {
+    "tidy": TIDY_COLUMNS,
+    "profiles": PROFILE_COLUMNS,
+    "per_job": PER_JOB_COLUMNS,
+    "files": FILE_COLUMNS,
+    "rejects": REJECT_COLUMNS,
+}
 
 
 import logging
@@ -31,56 +69,171 @@ def parse_job_id(filename: str) -> int:
 
 def load_json_safely(path: Path) -> Dict[str, Any]:
     try:
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
+        with open(path, "rb") as f:
+            return json.loads(f.read())
     except Exception as exc:
         print(f"WARN: Failed to parse {path.name}: {exc}")
         return {}
 
 
-def consolidate(input_dir: Path) -> pd.DataFrame:
-    """
-    Flatten all JSON files into a tidy long-form DataFrame with columns:
-    - job_id, category_type, category_id, category_name, phrase, tool_name,
-      justification, profile, confidence, rationale
-    """
-    tidy_rows: List[Dict[str, Any]] = []
-    profile_rows: List[Dict[str, Any]] = []
-    per_job: Dict[int, Dict[str, Any]] = {}
-
+def list_analysis_files(input_dir: Path) -> List[Path]:
     files = sorted(input_dir.glob("analysis_*.json"))
     print(f"Found {len(files)} analysis files in {input_dir}")
+    return files
+
+
+def iter_analysis_store(store_dir: Path) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Yield (job_id, payload) for the latest record of every job in a JSONL store."""
+    # Read-only, so a consolidation never truncates a shard still being written.
+    store = AnalysisStore(store_dir, read_only=True)
+    print(f"Found {len(store)} analyses in store {store_dir}")
+    try:
+        for record in store.iter_records():
+            yield int(record["job_id"]), record
+    finally:
+        store.close()
+
+
+def add_flat_technology(flat, job_id, item) -> None:
+    """Formats 2 and 3: one technology (or category) per item."""
+    flat.add_tidy(
+        job_id,
+        "technology",
+        item.get("category"),
+        None,
+        item.get("technology"),
+        item.get("justification"),
+    )
+
+
+def add_nested_technology(flat, job_id, item) -> None:
+    """Format 1: a technology with the tools named for it."""
+    category_name = item.get("tech")
+    for tool in item.get("items", []) or []:
+        flat.add_tidy(job_id, "technology", category_name, None, tool, None)
+
+
+def add_flat_soft_skill(flat, job_id, item) -> None:
+    """Format 2: one phrase per item."""
+    flat.add_tidy(
+        job_id,
+        "soft_skill",
+        item.get("category"),
+        item.get("phrase"),
+        None,
+        item.get("justification"),
+    )
 
-    for fp in files:
-        job_id = parse_job_id(fp.name)
-        data = load_json_safely(fp)
-        if not data:
-            continue
 
-        analysis = data.get("analysis", {})
+def add_nested_soft_skill(flat, job_id, item) -> None:
+    """Format 1: a skill with evidence phrases, as strings or objects."""
+    category_name = item.get("skill")
+    for evidence_item in item.get("evidence", []) or []:
+        phrase = None
+        justification = None
+        if isinstance(evidence_item, dict):
+            phrase = evidence_item.get("phrase")
+            justification = evidence_item.get("justification")
+        elif isinstance(evidence_item, str):
+            phrase = evidence_item
+
+        if phrase:
+            flat.add_tidy(
+                job_id, "soft_skill", category_name, phrase, None, justification
+            )
+
+
+def add_soft_skill_phrases(flat, job_id, item) -> None:
+    """Format 3: a skill category with a list of phrases."""
+    category_name = item.get("skill_category")
+    for phrase in item.get("phrases", []) or []:
+        # Justification is outside phrases list
+        flat.add_tidy(job_id, "soft_skill", category_name, phrase, None, None)
+
+
+# Normalizers by the item kinds of analysis_schemas.
+TECHNOLOGY_NORMALIZERS = {
+    "nested": add_nested_technology,
+    "technology": add_flat_technology,
+    "category": add_flat_technology,
+}
+SOFT_SKILL_NORMALIZERS = {
+    "nested": add_nested_soft_skill,
+    "category": add_flat_soft_skill,
+    "skill_category": add_soft_skill_phrases,
+}
+
+
+class FlatAnalyses:
+    """
+    Flattened analyses, held as one list per output column.
+
+    `add` flattens one analysis. Per-job lists of technologies and soft
+    skills are kept as Python objects until `freeze` serializes them, so
+    that analyses of the same job can still be merged. The schema version
+    of every analysis and everything rejected are kept in `files` and
+    `rejects`.
+    """
+
+    def __init__(self):
+        self.tidy: Dict[str, List[Any]] = {c: [] for c in TIDY_COLUMNS}
+        self.profiles: Dict[str, List[Any]] = {c: [] for c in PROFILE_COLUMNS}
+        self.files: Dict[str, List[Any]] = {c: [] for c in FILE_COLUMNS}
+        self.rejects: Dict[str, List[Any]] = {c: [] for c in REJECT_COLUMNS}
+        self.per_job: Dict[int, Dict[str, Any]] = {}
+        self.per_job_columns: Dict[str, List[Any]] | None = None
+        # Row of each job in per_job_columns, built on the first merge.
+        self.positions: Dict[int, int] | None = None
+
+    def add_tidy(
+        self, job_id, category_type, category_name, phrase, tool_name, justification
+    ) -> None:
+        tidy = self.tidy
+        tidy["job_id"].append(job_id)
+        tidy["category_type"].append(category_type)
+        tidy["category_id"].append(None)
+        tidy["category_name"].append(category_name)
+        tidy["phrase"].append(phrase)
+        tidy["tool_name"].append(tool_name)
+        tidy["justification"].append(justification)
+
+    def reject(self, source: str, job_id, reason: str) -> None:
+        self.rejects["source_file"].append(source)
+        self.rejects["job_id"].append(job_id)
+        self.rejects["reason"].append(reason)
+
+    def add(self, job_id: int, data: Dict[str, Any], source: str) -> None:
+        schema, reason, technology_kinds, soft_skill_kinds = detect_schema(data)
+        self.files["source_file"].append(source)
+        self.files["job_id"].append(job_id)
+        self.files["schema"].append(schema)
+        if reason is not None:
+            self.reject(source, job_id, reason)
+            return
+
+        analysis = data["analysis"]
         classification = analysis.get("profile_classification", {})
 
         if isinstance(classification, dict):
             profile = classification.get("profile")
             confidence = classification.get("confidence_score")
             rationale = classification.get("rationale")
+            technologies = classification.get("technologies", []) or []
+            soft_skills = classification.get("soft_skills", []) or []
         else:  # Handle case where classification is a string or other non-dict type
             profile = str(classification) if classification is not None else None
             confidence = None
             rationale = None
+            technologies = soft_skills = []
 
-        profile_rows.append(
-            {
-                "job_id": job_id,
-                "profile": profile,
-                "confidence": confidence,
-                "rationale": rationale,
-            }
-        )
+        self.profiles["job_id"].append(job_id)
+        self.profiles["profile"].append(profile)
+        self.profiles["confidence"].append(confidence)
+        self.profiles["rationale"].append(rationale)
 
         # Initialize per-job aggregation structure
-        if job_id not in per_job:
-            per_job[job_id] = {
+        if job_id not in self.per_job:
+            self.per_job[job_id] = {
                 "job_id": job_id,
                 "profile": profile,
                 "confidence": confidence,
@@ -89,187 +242,315 @@ def consolidate(input_dir: Path) -> pd.DataFrame:
                 "technologies": [],
                 "soft_skills": [],
             }
+        job = self.per_job[job_id]
 
         # Process thematic analysis for the tidy dataset
-        if "thematic_analysis" in analysis:
-            for category_type, items in analysis["thematic_analysis"].items():
-                if items:
-                    for item in items:
-                        tool_name = None
-                        if category_type == "technologies":
-                            tool_name = item.get("phrase")
-
-                        singular_category = category_type.rstrip("s")
-                        if singular_category == "technologie":
-                            singular_category = "technology"
-
-                        tidy_row = {
-                            "job_id": job_id,
-                            "category_type": singular_category,
-                            "category_id": None,
-                            "category_name": item.get("category"),
-                            "phrase": item.get("phrase"),
-                            "tool_name": tool_name,
-                            "justification": item.get("justification"),
-                        }
-                        tidy_rows.append(tidy_row)
-
-        # Handle profile classification for the profiles dataset
-        if "profile_classification" in analysis:
-            # Initialize per-job aggregation structure
-            if job_id not in per_job:
-                per_job[job_id] = {
-                    "job_id": job_id,
-                    "profile": profile,
-                    "confidence": confidence,
-                    "rationale": rationale,
-                    "job_tasks": [],
-                    "technologies": [],
-                    "soft_skills": [],
-                }
-
-            # Technologies
-            for item in (
-                analysis["profile_classification"].get("technologies", []) or []
-            ):
-                # Handle nested structure (format 1)
-                if "tech" in item and "items" in item:
-                    category_name = item.get("tech")
-                    for tool in item.get("items", []) or []:
-                        tidy_rows.append(
-                            {
-                                "job_id": job_id,
-                                "category_type": "technology",
-                                "category_id": None,
-                                "category_name": category_name,
-                                "phrase": None,
-                                "tool_name": tool,
-                                "justification": None,
-                            }
-                        )
-                    per_job[job_id]["technologies"].append(item)
-                # Handle flat structure (format 2 & 3)
-                else:
-                    tidy_rows.append(
-                        {
-                            "job_id": job_id,
-                            "category_type": "technology",
-                            "category_id": None,
-                            "category_name": item.get("category"),
-                            "phrase": None,
-                            "tool_name": item.get(
-                                "technology"
-                            ),  # Format 3 has 'technology'
-                            "justification": item.get("justification"),
-                        }
-                    )
-                    per_job[job_id]["technologies"].append(item)
-
-            # Soft skills
-            for item in analysis["profile_classification"].get("soft_skills", []) or []:
-                # Handle nested structure (format 1)
-                if "skill" in item and "evidence" in item:
-                    category_name = item.get("skill")
-                    for evidence_item in item.get("evidence", []) or []:
-                        phrase = None
-                        justification = None
-                        if isinstance(evidence_item, dict):
-                            phrase = evidence_item.get("phrase")
-                            justification = evidence_item.get("justification")
-                        elif isinstance(evidence_item, str):
-                            phrase = evidence_item
-
-                        if phrase:
-                            tidy_rows.append(
-                                {
-                                    "job_id": job_id,
-                                    "category_type": "soft_skill",
-                                    "category_id": None,
-                                    "category_name": category_name,
-                                    "phrase": phrase,
-                                    "tool_name": None,
-                                    "justification": justification,
-                                }
-                            )
-                    per_job[job_id]["soft_skills"].append(item)
-                # Handle flat structure (format 2)
-                elif "category" in item:
-                    tidy_rows.append(
-                        {
-                            "job_id": job_id,
-                            "category_type": "soft_skill",
-                            "category_id": None,
-                            "category_name": item.get("category"),
-                            "phrase": item.get("phrase"),
-                            "tool_name": None,
-                            "justification": item.get("justification"),
-                        }
-                    )
-                    per_job[job_id]["soft_skills"].append(item)
-                # Handle skill_category structure (format 3)
-                elif "skill_category" in item:
-                    category_name = item.get("skill_category")
-                    for phrase in item.get("phrases", []):
-                        tidy_rows.append(
-                            {
-                                "job_id": job_id,
-                                "category_type": "soft_skill",
-                                "category_id": None,
-                                "category_name": category_name,
-                                "phrase": phrase,
-                                "tool_name": None,
-                                "justification": None,  # Justification is outside phrases list
-                            }
-                        )
-                    per_job[job_id]["soft_skills"].append(item)
-
-    # Flatten the collected data into a DataFrame
-    tidy_df_rows = []
-    for row in tidy_rows:
-        flat_row = row.copy()
-        # Remove keys that are not simple types if they exist
-        flat_row.pop("evidence", None)
-        flat_row.pop("items", None)
-        tidy_df_rows.append(flat_row)
-
-    tidy_df = pd.DataFrame(tidy_df_rows)
-
-    profiles_df = (
-        pd.DataFrame(profile_rows).drop_duplicates(subset=["job_id"])
-        if profile_rows
-        else pd.DataFrame(columns=["job_id", "profile", "confidence", "rationale"])
-    )
-
-    per_job_rows: List[Dict[str, Any]] = [
-        {
-            "job_id": job["job_id"],
-            "profile": job["profile"],
-            "confidence": job["confidence"],
-            "rationale": job["rationale"],
-            "job_tasks": json.dumps(job["job_tasks"], ensure_ascii=False),
-            "technologies": json.dumps(job["technologies"], ensure_ascii=False),
-            "soft_skills": json.dumps(job["soft_skills"], ensure_ascii=False),
+        for section, items in (analysis.get("thematic_analysis") or {}).items():
+            if not items:
+                continue
+            category_type = thematic_category_type(section)
+            phrase_is_tool = section == "technologies"
+            for item in items:
+                if not isinstance(item, dict):
+                    self.reject(source, job_id, f"{section} item is not an object")
+                    continue
+                phrase = item.get("phrase")
+                self.add_tidy(
+                    job_id,
+                    category_type,
+                    item.get("category"),
+                    phrase,
+                    phrase if phrase_is_tool else None,
+                    item.get("justification"),
+                )
+
+        # Items of the profile classification, by the kinds detect_schema found
+        for item, kind in zip(technologies, technology_kinds):
+            normalizer = TECHNOLOGY_NORMALIZERS.get(kind)
+            if normalizer is None:
+                self.reject(source, job_id, "unknown technology item format")
+                continue
+            normalizer(self, job_id, item)
+            job["technologies"].append(item)
+        for item, kind in zip(soft_skills, soft_skill_kinds):
+            normalizer = SOFT_SKILL_NORMALIZERS.get(kind)
+            if normalizer is None:
+                self.reject(source, job_id, "unknown soft skill item format")
+                continue
+            normalizer(self, job_id, item)
+            job["soft_skills"].append(item)
+
+    def freeze(self) -> "FlatAnalyses":
+        """Serializes the per-job lists into the per-job columns."""
+        columns: Dict[str, List[Any]] = {c: [] for c in PER_JOB_COLUMNS}
+        for job in self.per_job.values():
+            for column in PER_JOB_COLUMNS:
+                value = job[column]
+                if column in JSON_COLUMNS:
+                    value = json.dumps(value, ensure_ascii=False)
+                columns[column].append(value)
+        self.per_job_columns = columns
+        self.per_job = {}
+        return self
+
+    def tables(self) -> Dict[str, Dict[str, List[Any]]]:
+        return {
+            "tidy": self.tidy,
+            "profiles": self.profiles,
+            "per_job": self.per_job_columns,
+            "files": self.files,
+            "rejects": self.rejects,
         }
-        for job in per_job.values()
-    ]
-    per_job_df = pd.DataFrame(per_job_rows)
+
+    @classmethod
+    def from_tables(cls, tables: Dict[str, Dict[str, List[Any]]]) -> "FlatAnalyses":
+        flat = cls()
+        flat.tidy, flat.profiles = tables["tidy"], tables["profiles"]
+        flat.files, flat.rejects = tables["files"], tables["rejects"]
+        flat.per_job_columns = tables["per_job"]
+        return flat
+
+    def extend(self, other: "FlatAnalyses", merge_jobs: bool = True) -> None:
+        """
+        Appends the frozen analyses of `other` to this frozen batch.
+
+        With `merge_jobs`, a job already present keeps a single per-job row;
+        otherwise per-job rows are appended as they are.
+        """
+        for name in ("tidy", "profiles", "files", "rejects"):
+            table = getattr(self, name)
+            for column, values in getattr(other, name).items():
+                table[column].extend(values)
+
+        columns = self.per_job_columns
+        other_columns = other.per_job_columns
+        if not merge_jobs:
+            for column in PER_JOB_COLUMNS:
+                columns[column].extend(other_columns[column])
+            self.positions = None
+            return
+
+        if self.positions is None:
+            self.positions = {job_id: i for i, job_id in enumerate(columns["job_id"])}
+        positions = self.positions
+        for i, job_id in enumerate(other_columns["job_id"]):
+            if job_id not in positions:
+                positions[job_id] = len(columns["job_id"])
+                for column in PER_JOB_COLUMNS:
+                    columns[column].append(other_columns[column][i])
+                continue
+            # The same job in several files: concatenate its lists, as when
+            # the files are flattened together.
+            row = positions[job_id]
+            for column in JSON_COLUMNS:
+                merged = json.loads(columns[column][row]) + json.loads(
+                    other_columns[column][i]
+                )
+                columns[column][row] = json.dumps(merged, ensure_ascii=False)
+
+
+def parse_analysis_files(paths: List[Path]) -> FlatAnalyses:
+    """Flattens a batch of analysis files; runs in a worker process."""
+    flat = FlatAnalyses()
+    for path in paths:
+        # Files that fail to decode are recorded as rejects by `add`.
+        flat.add(parse_job_id(path.name), load_json_safely(path), path.name)
+    return flat.freeze()
+
+
+def parse_analysis_files_separately(
+    paths: List[Path],
+) -> Tuple[FlatAnalyses, List[Tuple[str, Dict[str, int]]]]:
+    """
+    Flattens a batch of analysis files without merging jobs across files,
+    and counts the rows each file contributes to each table.
+    """
+    batch = FlatAnalyses().freeze()
+    row_counts = []
+    for path in paths:
+        flat = parse_analysis_files([path])
+        row_counts.append(
+            (path.name, {name: len(t["job_id"]) for name, t in flat.tables().items()})
+        )
+        batch.extend(flat, merge_jobs=False)
+    return batch, row_counts
+
+
+def map_batches(function, files: List[Path], workers: int, batch_size: int):
+    """Applies `function` to batches of `files` over `workers` processes, in order."""
+    batches = [files[i : i + batch_size] for i in range(0, len(files), batch_size)]
+    if workers <= 1 or len(batches) <= 1:
+        yield from map(function, batches)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(function, batches)
+
+
+def flatten_files(files: List[Path], workers: int, batch_size: int) -> FlatAnalyses:
+    """Flattens `files` in batches over `workers` processes, keeping file order."""
+    combined = FlatAnalyses().freeze()
+    for flat in map_batches(parse_analysis_files, files, workers, batch_size):
+        combined.extend(flat)
+    return combined
+
+
+def flatten_files_incrementally(
+    files: List[Path], workers: int, batch_size: int, cache_dir: Path
+) -> FlatAnalyses:
+    """
+    Flattens only the files that are new or changed since the last run,
+    taking the rows of all other files from the consolidation cache.
+    """
+    cache = ConsolidationCache(cache_dir, FLATTEN_VERSION)
+    to_parse = cache.plan(files)
+
+    parsed = FlatAnalyses().freeze()
+    row_counts = []
+    batches = map_batches(parse_analysis_files_separately, to_parse, workers, batch_size)
+    for flat, counts in batches:
+        parsed.extend(flat, merge_jobs=False)
+        row_counts.extend(counts)
+    cache.add_part(parsed.tables(), row_counts)
+    cache.compact_if_needed(files, TABLE_COLUMNS)
+    cache.save()
+
+    tables, _ = cache.assemble(files, TABLE_COLUMNS)
+    combined = FlatAnalyses().freeze()
+    combined.extend(FlatAnalyses.from_tables(tables))
+    return combined
+
+
+def consolidate(
+    input_dir: Path,
+    input_store: Path | None = None,
+    output_format: str = "csv",
+    workers: int = WORKERS,
+    batch_size: int = BATCH_SIZE,
+    incremental: bool = False,
+    cache_dir: Path = CACHE_DIR,
+    clean: bool = False,
+) -> pd.DataFrame:
+    """
+    Flatten all JSON files into a tidy long-form DataFrame with columns:
+    - job_id, category_type, category_id, category_name, phrase, tool_name,
+      justification, profile, confidence, rationale
+
+    Files are decoded and flattened in batches of `batch_size` by `workers`
+    processes. With `incremental`, only files that changed since the last
+    incremental run are flattened; see `flatten_files_incrementally`.
+    If `input_store` is given, the analyses are read sequentially
+    from that JSONL store instead of one file per job. The three outputs are
+    written in `output_format` ("csv" or "parquet"). With `clean`, the tidy
+    and profiles outputs are cleaned as by clean_analysis_output.py before
+    they are written.
+
+    Every analysis is classified once by its schema version (see
+    analysis_schemas.py) and flattened by that version's normalizers. Files
+    and items of unknown formats are listed in a rejects file instead of
+    producing empty rows.
+    """
+    if input_store is not None:
+        flat = FlatAnalyses()
+        for job_id, data in iter_analysis_store(input_store):
+            flat.add(job_id, data, f"{input_store.name}#{job_id}")
+        flat.freeze()
+    elif incremental:
+        flat = flatten_files_incrementally(
+            list_analysis_files(input_dir), workers, batch_size, cache_dir
+        )
+    else:
+        flat = flatten_files(list_analysis_files(input_dir), workers, batch_size)
+
+    tidy_df = pd.DataFrame(flat.tidy)
+    profiles_df = pd.DataFrame(flat.profiles).drop_duplicates(subset=["job_id"])
+    if clean:
+        tidy_df = clean_consolidated(tidy_df)
+        profiles_df = clean_profiles(profiles_df)
+    per_job_df = pd.DataFrame(flat.per_job_columns)
+    print(schema_report(flat.files["schema"], flat.rejects))
 
     # Save outputs
-    OUTPUT_TIDY_CSV.parent.mkdir(parents=True, exist_ok=True)
-    tidy_df.to_csv(OUTPUT_TIDY_CSV, index=False, encoding="utf-8")
-    profiles_df.to_csv(OUTPUT_PROFILES_CSV, index=False, encoding="utf-8")
-    per_job_df.to_csv(OUTPUT_PER_JOB_CSV, index=False, encoding="utf-8")
-
-    print(f"Saved tidy dataset to: {OUTPUT_TIDY_CSV}")
-    print(f"Saved profiles dataset to: {OUTPUT_PROFILES_CSV}")
-    print(f"Saved per-job consolidated dataset to: {OUTPUT_PER_JOB_CSV}")
+    tidy_path = write_artifact(tidy_df, OUTPUT_TIDY_CSV, output_format)
+    profiles_path = write_artifact(profiles_df, OUTPUT_PROFILES_CSV, output_format)
+    per_job_path = write_artifact(per_job_df, OUTPUT_PER_JOB_CSV, output_format)
+
+    print(f"Saved tidy dataset to: {tidy_path}")
+    print(f"Saved profiles dataset to: {profiles_path}")
+    print(f"Saved per-job consolidated dataset to: {per_job_path}")
+    rejects_path = write_artifact(
+        pd.DataFrame(flat.rejects), OUTPUT_REJECTS_CSV, output_format
+    )
+    print(f"Saved rejected files and items to: {rejects_path}")
     return tidy_df
 
 
 def main():
-    if not INPUT_DIR.exists():
-        raise FileNotFoundError(f"Input directory does not exist: {INPUT_DIR}")
-    consolidate(INPUT_DIR)
+    parser = argparse.ArgumentParser(
+        description="Consolidate automated analyses into tidy CSV or Parquet files.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "--input-dir",
+        type=Path,
+        default=INPUT_DIR,
+        help="Directory with analysis_job_*.json files.",
+    )
+    parser.add_argument(
+        "--input-store",
+        type=Path,
+        nargs="?",
+        const=INPUT_STORE_DIR,
+        default=None,
+        help="Read from the append-only JSONL store instead of per-job JSON files "
+        f"(default store: {INPUT_STORE_DIR}).",
+    )
+    parser.add_argument(
+        "--format",
+        choices=FORMATS,
+        default="csv",
+        help="File format of the consolidated outputs.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=WORKERS,
+        help="Processes decoding and flattening analysis files (1: no pool).",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=BATCH_SIZE,
+        help="Analysis files per worker task.",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help=f"Only flatten new or changed files, reusing earlier rows cached in {CACHE_DIR}.",
+    )
+    parser.add_argument(
+        "--clean",
+        action="store_true",
+        help="Write cleaned outputs directly, making clean_analysis_output.py unnecessary.",
+    )
+    args = parser.parse_args()
+
+    if args.input_store is not None:
+        if not args.input_store.exists():
+            raise FileNotFoundError(f"Input store does not exist: {args.input_store}")
+        consolidate(
+            args.input_dir, args.input_store, args.format, clean=args.clean
+        )
+        return
+    if not args.input_dir.exists():
+        raise FileNotFoundError(f"Input directory does not exist: {args.input_dir}")
+    consolidate(
+        args.input_dir,
+        output_format=args.format,
+        workers=args.workers,
+        batch_size=args.batch_size,
+        incremental=args.incremental,
+        clean=args.clean,
+    )
 
 
 if __name__ == "__main__":
@@ -1,20 +1,146 @@
-import pandas as pd
+import argparse
+import hashlib
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+import pandas as pd
+
+from artifacts import FORMATS, write_artifact
+
 # --- Configuration ---
 WORKSPACE_DIR = Path(__file__).resolve().parent.parent
 INPUT_DIR = WORKSPACE_DIR / "data" / "raw"
 OUTPUT_CSV = WORKSPACE_DIR / "data" / "consolidated.csv"
+# Parsed exports, one file per content hash, plus a manifest of the inputs.
+CACHE_DIR = WORKSPACE_DIR / "data" / "cache" / "raw_exports"
+MANIFEST_FILE = "manifest.json"
+# Names of the cached frames written by parse_export; nothing else is deleted.
+CACHE_FILE_PATTERN = re.compile(r"[0-9a-f]{64}\.(parquet|pkl)")
+
+
+def file_digest(path: Path) -> str:
+    """SHA-256 of the file contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_manifest(cache_dir: Path) -> dict:
+    manifest_path = cache_dir / MANIFEST_FILE
+    if not manifest_path.exists():
+        return {}
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(cache_dir: Path, manifest: dict) -> None:
+    manifest_path = cache_dir / MANIFEST_FILE
+    tmp_path = manifest_path.with_suffix(".json.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=4, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+
+
+def current_digest(path: Path, manifest: dict) -> str:
+    """
+    Returns the content hash of `path`.
+
+    The hash recorded in the manifest is reused while the file's size and
+    modification time are unchanged, so unchanged exports are not re-read.
+    """
+    stat = path.stat()
+    entry = manifest.get(path.name)
+    if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+        return entry["sha256"]
+    return file_digest(path)
+
+
+def parse_export(path: Path, digest: str, cache_dir: Path) -> tuple[str, str]:
+    """
+    Parses one .xls export and stores the frame in the cache.
+
+    Runs in a worker process. Frames are stored as Parquet; a frame that Arrow
+    cannot represent (e.g. an object column mixing numbers and text) is
+    pickled instead, so the cached copy always round-trips unchanged.
+
+    Returns:
+        A tuple of (digest, name of the cache file).
+    """
+    # The 'xlrd' engine is required for .xls files.
+    df = pd.read_excel(path, engine="xlrd")
+    cache_path = cache_dir / f"{digest}.parquet"
+    try:
+        df.to_parquet(cache_path, index=False)
+    except Exception:
+        cache_path.unlink(missing_ok=True)
+        cache_path = cache_dir / f"{digest}.pkl"
+        df.to_pickle(cache_path)
+    return digest, cache_path.name
+
+
+def read_cached_frame(cache_path: Path) -> pd.DataFrame:
+    if cache_path.suffix == ".parquet":
+        return pd.read_parquet(cache_path)
+    return pd.read_pickle(cache_path)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Consolidate the raw .xls exports into a single dataset.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "--input-dir", type=Path, default=INPUT_DIR, help="Directory of .xls exports."
+    )
+    parser.add_argument(
+        "--output", type=Path, default=OUTPUT_CSV, help="Consolidated dataset."
+    )
+    parser.add_argument(
+        "--format",
+        choices=FORMATS,
+        default="csv",
+        help="File format of the consolidated dataset (the suffix of --output follows it).",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=CACHE_DIR,
+        help="Directory caching each parsed export by content hash.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Worker processes parsing exports in parallel (default: CPU count).",
+    )
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="Ignore the cache and re-parse every export.",
+    )
+    return parser.parse_args()
 
 
 def main():
     """
     Finds all .xls files in the input directory, consolidates them into
-    a single DataFrame, and saves it as a CSV file.
+    a single DataFrame, and saves it as a CSV or Parquet file.
+
+    Only exports that are new or whose contents changed since the last run are
+    parsed (in parallel worker processes); all others are loaded from the
+    cache. Exports are concatenated in file name order, i.e. by export time,
+    so rows from a new weekly export are appended at the end.
     """
-    print(f"--- Starting Data Consolidation from '{INPUT_DIR}' ---")
+    args = parse_args()
+    input_dir, cache_dir = args.input_dir, args.cache_dir
+    print(f"--- Starting Data Consolidation from '{input_dir}' ---")
 
-    xls_files = list(INPUT_DIR.glob("*.xls"))
+    xls_files = sorted(input_dir.glob("*.xls"))
 
     if not xls_files:
         print("No .xls files found. Exiting.")
@@ -22,15 +148,61 @@ def main():
 
     print(f"Found {len(xls_files)} .xls files to consolidate.")
 
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    manifest = {} if args.rebuild else load_manifest(cache_dir)
+    cached = {
+        entry["sha256"]: entry["cache_file"]
+        for entry in manifest.values()
+        if (cache_dir / entry["cache_file"]).exists()
+    }
+
+    digests = {file: current_digest(file, manifest) for file in xls_files}
+    to_parse = {}
+    for file, digest in digests.items():
+        if digest not in cached and digest not in to_parse.values():
+            to_parse[file] = digest
+    print(f"{len(xls_files) - len(to_parse)} export(s) cached, {len(to_parse)} to parse.")
+
+    failed = set()
+    if to_parse:
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            futures = {
+                executor.submit(parse_export, file, digest, cache_dir): file
+                for file, digest in to_parse.items()
+            }
+            for future, file in futures.items():
+                try:
+                    digest, cache_file = future.result()
+                    cached[digest] = cache_file
+                    print(f"  - Successfully read {file.name}")
+                except Exception as e:
+                    failed.add(file)
+                    print(f"  - FAILED to read {file.name}: {e}")
+
     all_dfs = []
+    new_manifest = {}
     for file in xls_files:
-        try:
-            # The 'xlrd' engine is required for .xls files.
-            df = pd.read_excel(file, engine="xlrd")
-            all_dfs.append(df)
-            print(f"  - Successfully read {file.name}")
-        except Exception as e:
-            print(f"  - FAILED to read {file.name}: {e}")
+        digest = digests[file]
+        # Also skips a copy of an export whose identical twin failed to parse.
+        if digest not in cached:
+            if file not in failed:
+                print(f"  - Skipping {file.name}: its contents could not be parsed.")
+            continue
+        stat = file.stat()
+        new_manifest[file.name] = {
+            "sha256": digest,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "cache_file": cached[digest],
+        }
+        all_dfs.append(read_cached_frame(cache_dir / cached[digest]))
+    save_manifest(cache_dir, new_manifest)
+
+    # Drop cached frames of exports that were removed or replaced.
+    keep = {entry["cache_file"] for entry in new_manifest.values()}
+    for path in cache_dir.iterdir():
+        if CACHE_FILE_PATTERN.fullmatch(path.name) and path.name not in keep:
+            path.unlink()
 
     if not all_dfs:
         print("Could not read any of the .xls files. Exiting.")
@@ -41,11 +213,8 @@ def main():
 
     print(f"Total rows consolidated: {len(consolidated_df)}")
 
-    # Ensure the output directory exists
-    OUTPUT_CSV.parent.mkdir(parents=True, exist_ok=True)
-
-    print(f"Saving consolidated data to '{OUTPUT_CSV}'...")
-    consolidated_df.to_csv(OUTPUT_CSV, index=False, encoding="utf-8")
+    output = write_artifact(consolidated_df, args.output, args.format)
+    print(f"Saved consolidated data to '{output}'.")
 
     print("--- Consolidation Complete ---")
 
@@ -0,0 +1,200 @@
+"""
+Incremental consolidation: already-flattened rows of every analysis file.
+
+Flattened rows are kept in append-only part files, one set per run, with
+one columnar table each for the tidy, profile, per-job, schema and reject
+rows. A manifest records for every analysis file its mtime, size and content
+digest, the version of the flattening code that produced its rows, the part
+holding them and the row range in each table. A later run only has to
+flatten files that are new or whose content changed, or whose rows came from
+another version; rows of changed or deleted files are simply no longer
+referenced, and are dropped when the parts are compacted.
+"""
+
+import hashlib
+import pickle
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import pandas as pd
+
+from artifacts import write_artifact
+
+TABLES = ["tidy", "profiles", "per_job", "files", "rejects"]
+# Rewrite everything into a single part once there are more parts than this.
+MAX_PARTS = 16
+
+Columns = Dict[str, List[Any]]
+
+
+def file_digest(path: Path) -> str:
+    with open(path, "rb") as f:
+        return hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+
+
+class ConsolidationCache:
+    def __init__(self, cache_dir: Path, version: int):
+        self.cache_dir = Path(cache_dir)
+        self.manifest_path = self.cache_dir / "manifest.parquet"
+        self.version = version
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        if self.manifest_path.exists():
+            manifest = pd.read_parquet(self.manifest_path)
+            # A manifest written before a table was added cannot locate its
+            # rows, and rows flattened by another version of the code may
+            # differ; such files are flattened again.
+            if all(f"{table}_start" in manifest.columns for table in TABLES) and (
+                "version" in manifest.columns
+            ):
+                self.entries = {
+                    e["source_file"]: e
+                    for e in manifest.to_dict("records")
+                    if e["version"] == version
+                }
+        self.pending: Dict[str, Tuple[int, int, str]] = {}
+        self.parts: Dict[int, Dict[str, Columns]] = {}
+
+    def plan(self, files: List[Path]) -> List[Path]:
+        """
+        The files among `files` that need flattening.
+
+        Files whose size and mtime are unchanged are trusted; otherwise the
+        content digest decides. Entries of files no longer present are dropped.
+        """
+        names = {path.name for path in files}
+        deleted = [name for name in self.entries if name not in names]
+        for name in deleted:
+            del self.entries[name]
+
+        to_parse = []
+        for path in files:
+            stat = path.stat()
+            entry = self.entries.get(path.name)
+            if entry and (entry["size"], entry["mtime_ns"]) == (stat.st_size, stat.st_mtime_ns):
+                continue
+            digest = file_digest(path)
+            if entry and entry["digest"] == digest:
+                entry["size"], entry["mtime_ns"] = stat.st_size, stat.st_mtime_ns
+                continue
+            self.pending[path.name] = (stat.st_mtime_ns, stat.st_size, digest)
+            to_parse.append(path)
+
+        print(
+            f"Consolidation cache: {len(files) - len(to_parse)} unchanged, "
+            f"{len(to_parse)} new or changed, {len(deleted)} deleted file(s)."
+        )
+        return to_parse
+
+    def _part_path(self, part: int, table: str, suffix: str) -> Path:
+        return self.cache_dir / f"part_{part:05d}.{table}{suffix}"
+
+    def _write_part(self, part: int, tables: Dict[str, Columns]) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        for table, columns in tables.items():
+            # A part number freed by discarded entries may still have stale files.
+            for suffix in (".parquet", ".pkl"):
+                self._part_path(part, table, suffix).unlink(missing_ok=True)
+            try:
+                arrow_table = pa.Table.from_pydict(columns)
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                # Columns mixing value types cannot be stored in Parquet.
+                path = self._part_path(part, table, ".pkl")
+                with open(path.with_suffix(".tmp"), "wb") as f:
+                    pickle.dump(columns, f)
+            else:
+                path = self._part_path(part, table, ".parquet")
+                pq.write_table(arrow_table, path.with_suffix(".tmp"))
+            path.with_suffix(".tmp").replace(path)
+        self.parts[part] = tables
+
+    def _load_part(self, part: int) -> Dict[str, Columns]:
+        import pyarrow.parquet as pq
+
+        if part not in self.parts:
+            tables = {}
+            for table in TABLES:
+                parquet_path = self._part_path(part, table, ".parquet")
+                if parquet_path.exists():
+                    # to_pydict returns the original Python values, so the
+                    # outputs infer the same dtypes as a full consolidation.
+                    tables[table] = pq.read_table(parquet_path).to_pydict()
+                else:
+                    with open(self._part_path(part, table, ".pkl"), "rb") as f:
+                        tables[table] = pickle.load(f)
+            self.parts[part] = tables
+        return self.parts[part]
+
+    def add_part(
+        self, tables: Dict[str, Columns], row_counts: List[Tuple[str, Dict[str, int]]]
+    ) -> None:
+        """
+        Stores newly flattened rows as a new part.
+
+        `row_counts` lists, in row order, each parsed file with its number of
+        rows in every table.
+        """
+        if not row_counts:
+            return
+        part = max((int(e["part"]) for e in self.entries.values()), default=-1) + 1
+        part = max(part, max(self.parts, default=-1) + 1)
+        self._write_part(part, tables)
+        offsets = {table: 0 for table in TABLES}
+        for name, counts in row_counts:
+            mtime_ns, size, digest = self.pending.pop(name)
+            entry = {
+                "source_file": name,
+                "mtime_ns": mtime_ns,
+                "size": size,
+                "digest": digest,
+                "version": self.version,
+                "part": part,
+            }
+            for table in TABLES:
+                entry[f"{table}_start"] = offsets[table]
+                offsets[table] += counts[table]
+                entry[f"{table}_stop"] = offsets[table]
+            self.entries[name] = entry
+
+    def assemble(self, files: List[Path], columns: Dict[str, List[str]]):
+        """
+        The cached rows of `files`, in the order of `files`, plus the row
+        ranges of every file in the assembled tables.
+        """
+        assembled = {table: {c: [] for c in columns[table]} for table in TABLES}
+        ranges = []
+        for path in files:
+            entry = self.entries[path.name]
+            part = self._load_part(int(entry["part"]))
+            counts = {}
+            for table in TABLES:
+                start, stop = int(entry[f"{table}_start"]), int(entry[f"{table}_stop"])
+                counts[table] = stop - start
+                if counts[table]:
+                    for column, values in part[table].items():
+                        assembled[table][column].extend(values[start:stop])
+            ranges.append((path.name, counts))
+        return assembled, ranges
+
+    def compact_if_needed(self, files: List[Path], columns: Dict[str, List[str]]):
+        """Rewrites the live rows of all parts into one once parts pile up."""
+        live_parts = {int(e["part"]) for e in self.entries.values()}
+        if len(live_parts) <= MAX_PARTS:
+            return
+        print(f"Compacting {len(live_parts)} consolidation cache parts...")
+        assembled, ranges = self.assemble(files, columns)
+        for name, _ in ranges:
+            entry = self.entries[name]
+            self.pending[name] = (entry["mtime_ns"], entry["size"], entry["digest"])
+        self.add_part(assembled, ranges)
+
+    def save(self) -> None:
+        """Writes the manifest and deletes parts no file refers to anymore."""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        write_artifact(pd.DataFrame(list(self.entries.values())), self.manifest_path, "parquet")
+        live_parts = {int(e["part"]) for e in self.entries.values()}
+        for path in self.cache_dir.glob("part_*"):
+            if int(path.name.split(".")[0].split("_")[1]) not in live_parts:
+                path.unlink()
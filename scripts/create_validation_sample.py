@@ -1,6 +1,8 @@
 import pandas as pd
 from pathlib import Path
 
+from artifacts import read_artifact
+
 # --- Configuration ---
 WORKSPACE_DIR = Path(__file__).resolve().parent.parent
 ANALYSIS_RESULTS_PATH = WORKSPACE_DIR / "data" / "analysis_results.csv"
@@ -25,14 +27,13 @@ def main():
 
     # 2. Load the original, deduplicated data to get the job ad text
     try:
-        df_original = pd.read_csv(ORIGINAL_DATA_PATH)
-        # Create 'full_text' and 'job_id' to match the analysis file
+        df_original = read_artifact(ORIGINAL_DATA_PATH)
+        # Create 'full_text' to match the analysis file
         df_original["full_text"] = (
             df_original["Vacaturetitel"].fillna("")
             + "\n\n"
             + df_original["Functieomschrijving"].fillna("")
         )
-        df_original["job_id"] = df_original.index
         print(f"Loaded {len(df_original)} records from {ORIGINAL_DATA_PATH}")
     except FileNotFoundError:
         print(f"ERROR: Original data file not found at {ORIGINAL_DATA_PATH}")
@@ -1,23 +1,59 @@
 import pandas as pd
+import argparse
+import hashlib
 import os
+from collections import defaultdict
+from pathlib import Path
 
+from artifacts import (
+    FORMATS,
+    INTEGER_COLUMNS,
+    ArtifactWriter,
+    iter_artifact_chunks,
+    read_artifact,
+    resolve_artifact,
+    write_artifact,
+)
+from job_ids import JOB_ID_MAP_PATH, JobIdRegistry
+from near_duplicates import mark_near_duplicates
 
-def deduplicate_csv(input_path, output_path, column_names):
+# Separates key fields in the hashed row key; cannot occur in CSV text fields.
+KEY_SEPARATOR = "\x1f"
+MISSING_VALUE = "\x00"
+
+
+def deduplicate_csv(
+    input_path,
+    output_path,
+    column_names,
+    output_format=None,
+    near_duplicate_threshold=None,
+    keep_representatives=False,
+    job_id_map=JOB_ID_MAP_PATH,
+):
     """
-    Reads a CSV file, removes duplicate rows based on a specific column,
-    and saves the result to a new CSV file.
+    Reads a CSV or Parquet file, removes duplicate rows based on specific columns,
+    and saves the result to a new file.
 
     Args:
-        input_path (str): The path to the input CSV file.
-        output_path (str): The path to save the deduplicated CSV file.
+        input_path (str): The path to the input file (either format).
+        output_path (str): The path to save the deduplicated file.
         column_names (str): The name of the column to check for duplicates.
+        output_format (str): "csv" or "parquet"; defaults to the suffix of output_path.
+        near_duplicate_threshold (float): If set, also clusters ads whose
+            Functieomschrijving has at least this estimated Jaccard similarity
+            and adds a near_duplicate_cluster column with the cluster's first job_id.
+        keep_representatives (bool): Keep only the first ad of each near-duplicate cluster.
+        job_id_map (str): Persistent table of content keys and their job_ids;
+            ads seen in earlier runs keep their id, new ads get the next free one.
     """
+    input_path = resolve_artifact(input_path)
     if not os.path.exists(input_path):
         print(f"Error: Input file not found at {input_path}")
         return
 
     print(f"Reading data from {input_path}...")
-    df = pd.read_csv(input_path)
+    df = read_artifact(input_path)
 
     print(f"Original number of rows: {len(df)}")
 
@@ -29,22 +65,93 @@ def deduplicate_csv(input_path, output_path, column_names):
     num_duplicates = len(df) - len(deduplicated_df)
     print(f"Number of duplicate rows removed: {num_duplicates}")
 
-    # --- Add a unique job_id ---
-    print("Adding unique job_id to each row...")
+    # --- Add a stable job_id ---
+    print(f"Assigning content-derived job_ids using {job_id_map}...")
+    registry = JobIdRegistry(job_id_map)
+    deduplicated_df = deduplicated_df.drop(columns="job_id", errors="ignore")
     deduplicated_df = deduplicated_df.reset_index(drop=True)
-    deduplicated_df.insert(0, "job_id", deduplicated_df.index)
+    deduplicated_df.insert(0, "job_id", registry.assign(deduplicated_df))
+    registry.save()
+    print(f"Registered {registry.new_ids} new job_ids.")
 
-    # Create the directory for the output file if it doesn't exist
-    output_dir = os.path.dirname(output_path)
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
+    if near_duplicate_threshold is not None:
+        print("Detecting near-duplicate descriptions with MinHash-LSH...")
+        deduplicated_df = mark_near_duplicates(
+            deduplicated_df,
+            threshold=near_duplicate_threshold,
+            keep_representatives=keep_representatives,
+        )
+        if keep_representatives:
+            print(f"Number of rows after keeping one ad per cluster: {len(deduplicated_df)}")
 
     print(f"Saving deduplicated data to {output_path}...")
-    deduplicated_df.to_csv(output_path, index=False)
+    output_path = write_artifact(deduplicated_df, Path(output_path), output_format)
+    print(f"Saved {output_path}.")
 
     print("Deduplication complete.")
 
 
+def row_digest(values) -> bytes:
+    """128-bit BLAKE2b digest of one row's key values, stripped of surrounding whitespace."""
+    key = KEY_SEPARATOR.join(
+        MISSING_VALUE if pd.isna(value) else str(value).strip() for value in values
+    )
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+
+
+def deduplicate_streaming(
+    input_path,
+    output_path,
+    column_names,
+    chunksize=100_000,
+    output_format=None,
+    job_id_map=JOB_ID_MAP_PATH,
+):
+    """
+    Deduplicates a CSV or Parquet file chunk by chunk.
+
+    Each row's key columns are hashed to a 16-byte digest; only the set of
+    digests seen so far is kept in memory, and the first occurrence of every
+    key is written out as soon as its chunk has been processed. Memory thus
+    grows with the number of unique ads rather than with the size of the
+    export. Rows other than the id/year columns are read as text, so the output
+    holds the input's values unchanged; job_ids come from the same persistent
+    mapping as in `deduplicate_csv`.
+    """
+    input_path = resolve_artifact(input_path)
+    if not os.path.exists(input_path):
+        print(f"Error: Input file not found at {input_path}")
+        return
+
+    print(f"Streaming data from {input_path} in chunks of {chunksize} rows...")
+    print(f"Deduplicating data based on the columns: {', '.join(column_names)}...")
+    dtype = defaultdict(lambda: str, {c: "int64" for c in INTEGER_COLUMNS})
+    registry = JobIdRegistry(job_id_map)
+    seen = set()
+    total_rows = 0
+    writer = ArtifactWriter(Path(output_path), output_format)
+    for chunk in iter_artifact_chunks(input_path, chunksize, dtype=dtype):
+        total_rows += len(chunk)
+        keep = []
+        for values in chunk[column_names].itertuples(index=False, name=None):
+            digest = row_digest(values)
+            keep.append(digest not in seen)
+            seen.add(digest)
+        # Re-deduplicating an earlier output looks the job_ids up again.
+        unique = chunk[keep].drop(columns="job_id", errors="ignore")
+        unique.insert(0, "job_id", registry.assign(unique))
+        writer.write(unique)
+    output_path = writer.close()
+    registry.save()
+
+    print(f"Original number of rows: {total_rows}")
+    print(f"Number of rows after deduplication: {writer.rows}")
+    print(f"Number of duplicate rows removed: {total_rows - writer.rows}")
+    print(f"Registered {registry.new_ids} new job_ids.")
+    print(f"Saved deduplicated data to {output_path}.")
+    print("Deduplication complete.")
+
+
 if __name__ == "__main__":
     # Define file paths
     # Assuming the script is run from the root of the project
@@ -62,4 +169,75 @@ if __name__ == "__main__":
         "Maand (van datum gevonden)",
     ]
 
-    deduplicate_csv(INPUT_CSV_PATH, OUTPUT_CSV_PATH, DEDUPLICATION_COLUMNS)
+    parser = argparse.ArgumentParser(
+        description="Remove duplicate job ads and assign job_ids.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "--input",
+        default=INPUT_CSV_PATH,
+        help="Consolidated dataset; the newest of its .csv/.parquet copies is read.",
+    )
+    parser.add_argument(
+        "--output", default=OUTPUT_CSV_PATH, help="Deduplicated dataset."
+    )
+    parser.add_argument(
+        "--format",
+        choices=FORMATS,
+        default="csv",
+        help="File format of the deduplicated dataset.",
+    )
+    parser.add_argument(
+        "--streaming",
+        action="store_true",
+        help="Deduplicate chunk by chunk on hashed keys instead of loading the whole file.",
+    )
+    parser.add_argument(
+        "--chunksize",
+        type=int,
+        default=100_000,
+        help="Rows per chunk in --streaming mode.",
+    )
+    parser.add_argument(
+        "--near-duplicates",
+        type=float,
+        metavar="THRESHOLD",
+        help="Also cluster ads whose descriptions have at least this Jaccard similarity (e.g. 0.8).",
+    )
+    parser.add_argument(
+        "--keep-representatives",
+        action="store_true",
+        help="With --near-duplicates, keep only the first ad of each cluster.",
+    )
+    parser.add_argument(
+        "--job-id-map",
+        default=JOB_ID_MAP_PATH,
+        help="Persistent table mapping ad content keys to job_ids.",
+    )
+    args = parser.parse_args()
+    if args.near_duplicates is not None and args.streaming:
+        parser.error("--near-duplicates is not supported with --streaming")
+    if args.near_duplicates is not None and not 0 < args.near_duplicates <= 1:
+        parser.error("--near-duplicates must be in (0, 1]")
+    if args.keep_representatives and args.near_duplicates is None:
+        parser.error("--keep-representatives requires --near-duplicates")
+
+    if args.streaming:
+        deduplicate_streaming(
+            args.input,
+            args.output,
+            DEDUPLICATION_COLUMNS,
+            args.chunksize,
+            args.format,
+            args.job_id_map,
+        )
+    else:
+        deduplicate_csv(
+            args.input,
+            args.output,
+            DEDUPLICATION_COLUMNS,
+            args.format,
+            args.near_duplicates,
+            args.keep_representatives,
+            args.job_id_map,
+        )
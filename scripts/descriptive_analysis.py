@@ -3,13 +3,15 @@ import seaborn as sns
 import matplotlib.pyplot as plt
 from pathlib import Path
 
+from analysis_dataset import AnalysisDataset
 
-def perform_descriptive_analysis(tidy_input_csv, profiles_csv, output_dir):
+
+def perform_descriptive_analysis(dataset: AnalysisDataset, output_dir):
     """
     Performs a descriptive statistical analysis on the consolidated data.
     """
-    tidy_df = pd.read_csv(tidy_input_csv)
-    profiles_df = pd.read_csv(profiles_csv)
+    tidy_df = dataset.tidy
+    profiles_df = dataset.profiles
 
     print("--- Tidy Dataset Info ---")
     tidy_df.info()
@@ -47,8 +49,10 @@ def perform_descriptive_analysis(tidy_input_csv, profiles_csv, output_dir):
     )
 
     print("\n--- Analysis of Job Tasks ---")
-    job_tasks_df = tidy_df[tidy_df["category_type"] == "job_task"]
-    job_task_counts = job_tasks_df["category_name"].value_counts()
+    job_tasks_df = dataset.category("job_task")
+    job_task_counts = (
+        job_tasks_df["category_name"].cat.remove_unused_categories().value_counts()
+    )
     print(job_task_counts)
 
     # Plot job task distribution
@@ -64,10 +68,15 @@ def perform_descriptive_analysis(tidy_input_csv, profiles_csv, output_dir):
 
     print("\n--- Analysis of Technologies ---")
 
-    technologies_df = tidy_df[tidy_df["category_type"] == "technology"].copy()
+    technologies_df = dataset.category("technology")
 
     # Count by category_name as category_id might be missing
-    tech_counts = technologies_df["category_name"].value_counts().head(20)  # Top 20
+    tech_counts = (
+        technologies_df["category_name"]
+        .cat.remove_unused_categories()
+        .value_counts()
+        .head(20)  # Top 20
+    )
     print(tech_counts)
 
     # Plot technology distribution
@@ -84,8 +93,10 @@ def perform_descriptive_analysis(tidy_input_csv, profiles_csv, output_dir):
     )
 
     print("\n--- Analysis of Soft Skills ---")
-    soft_skills_df = tidy_df[tidy_df["category_type"] == "soft_skill"]
-    skill_counts = soft_skills_df["category_name"].value_counts()
+    soft_skills_df = dataset.category("soft_skill")
+    skill_counts = (
+        soft_skills_df["category_name"].cat.remove_unused_categories().value_counts()
+    )
     print(skill_counts)
 
     # Plot soft skill distribution
@@ -102,12 +113,9 @@ def perform_descriptive_analysis(tidy_input_csv, profiles_csv, output_dir):
     )
 
 
-def compute_top_tools(tidy_df_path, profiles_df_path, output_dir):
+def compute_top_tools(dataset: AnalysisDataset, output_dir):
     """Computes the top tools overall and per profile."""
-    df_tidy = pd.read_csv(tidy_df_path)
-    df_profiles = pd.read_csv(profiles_df_path)
-
-    tech_df = df_tidy[df_tidy["category_type"] == "technology"].copy()
+    tech_df = dataset.category("technology")
 
     # --- Top Tools Overall ---
     # Ensure tool_name column has string values before using .str accessor
@@ -125,17 +133,17 @@ def compute_top_tools(tidy_df_path, profiles_df_path, output_dir):
         )
 
     # --- Top Tools by Profile ---
-    merged_df = pd.merge(tech_df, df_profiles, on="job_id")
-    if pd.api.types.is_string_dtype(merged_df["tool_name"]):
-        valid_tools_by_profile = merged_df[
-            pd.notna(merged_df["tool_name"])
-            & (merged_df["tool_name"].str.strip() != "")
+    # The rows already carry their job's profile; rows of jobs without one
+    # drop out of the groupby.
+    if pd.api.types.is_string_dtype(tech_df["tool_name"]):
+        valid_tools_by_profile = tech_df[
+            pd.notna(tech_df["tool_name"]) & (tech_df["tool_name"].str.strip() != "")
         ]
 
         top_tools_by_profile = (
-            valid_tools_by_profile.groupby("profile")["tool_name"]
+            valid_tools_by_profile.groupby("profile", observed=True)["tool_name"]
             .value_counts()
-            .groupby(level=0)
+            .groupby(level=0, observed=True)
             .head(10)
             .reset_index(name="Frequency")
         )
@@ -149,16 +157,13 @@ def compute_top_tools(tidy_df_path, profiles_df_path, output_dir):
         )
 
 
-def derive_focus_rq1b(tidy_input_csv, output_dir):
+def derive_focus_rq1b(dataset: AnalysisDataset, output_dir):
     """
     Derive focus per job based on presence of TASK3 (Modeling) and TASK4 (Software Development).
     Focus categories: Data Science, Software Engineering, Data Science & Software Engineering, No info
     Saves: focus_by_job.csv and focus_distribution.png
     """
-    tidy_df = pd.read_csv(tidy_input_csv)
-    tasks = tidy_df[tidy_df["category_type"] == "job_task"][
-        ["job_id", "category_name"]
-    ].copy()
+    tasks = dataset.category("job_task")[["job_id", "category_name"]]
 
     # Presence flags per job
     modeling = (
@@ -212,18 +217,15 @@ def derive_focus_rq1b(tidy_input_csv, output_dir):
     print(f"Saved focus distribution plot to {output_dir}/focus_distribution.png")
 
 
-def job_task_coverage_per_job(tidy_input_csv, output_dir):
+def job_task_coverage_per_job(dataset: AnalysisDataset, output_dir):
     """
     Count, for each job task category, how many unique job ads mention it at least once.
     Saves: job_task_jobs_counts.csv and job_task_jobs_distribution.png
     """
-    tidy_df = pd.read_csv(tidy_input_csv)
-    tasks = tidy_df[tidy_df["category_type"] == "job_task"][
-        ["job_id", "category_name"]
-    ].dropna()
+    tasks = dataset.category("job_task")[["job_id", "category_name"]].dropna()
 
     unique_pairs = tasks.drop_duplicates()
-    counts = unique_pairs["category_name"].value_counts()
+    counts = unique_pairs["category_name"].cat.remove_unused_categories().value_counts()
 
     # Save CSV
     counts.reset_index().rename(
@@ -245,31 +247,27 @@ def job_task_coverage_per_job(tidy_input_csv, output_dir):
     )
 
 
-def perform_profile_analysis(tidy_input_csv, profiles_csv):
+def perform_profile_analysis(dataset: AnalysisDataset):
     """
     Analyzes the skills and technologies associated with each engineer profile.
     """
-    tidy_df = pd.read_csv(tidy_input_csv)
-    profiles_df = pd.read_csv(profiles_csv)
-    df = tidy_df.merge(profiles_df, on="job_id", how="left")
-
     # Filter for relevant profiles
     profiles = ["GenAI Engineer", "ML Engineer"]
-    df_filtered = df[df["profile"].isin(profiles)]
+    df_filtered = dataset.for_profiles(profiles)
 
     print("\n--- Cross-Tabulation: Profiles vs. Job Tasks ---")
     task_profile_ct = pd.crosstab(df_filtered["category_name"], df_filtered["profile"])
     print(task_profile_ct)
 
     print("\n--- Cross-Tabulation: Profiles vs. Technologies ---")
-    technologies_df = df_filtered[df_filtered["category_type"] == "technology"].copy()
+    technologies_df = dataset.for_profiles(profiles, "technology")
     tech_profile_ct = pd.crosstab(
         technologies_df["category_name"], technologies_df["profile"]
     )
     print(tech_profile_ct)
 
     print("\n--- Cross-Tabulation: Profiles vs. Soft Skills ---")
-    soft_skills_df = df_filtered[df_filtered["category_type"] == "soft_skill"]
+    soft_skills_df = dataset.for_profiles(profiles, "soft_skill")
     skill_profile_ct = pd.crosstab(
         soft_skills_df["category_name"], soft_skills_df["profile"]
     )
@@ -283,8 +281,10 @@ if __name__ == "__main__":
     OUTPUT_DIR = Path("data/analysis_results")
 
     OUTPUT_DIR.mkdir(exist_ok=True)
-    perform_descriptive_analysis(INPUT_TIDY_CSV, INPUT_PROFILES_CSV, OUTPUT_DIR)
-    compute_top_tools(INPUT_TIDY_CSV, INPUT_PROFILES_CSV, OUTPUT_DIR)
-    derive_focus_rq1b(INPUT_TIDY_CSV, OUTPUT_DIR)
-    job_task_coverage_per_job(INPUT_TIDY_CSV, OUTPUT_DIR)
-    perform_profile_analysis(INPUT_TIDY_CSV, INPUT_PROFILES_CSV)
+    # Loaded once and shared by all analyses.
+    dataset = AnalysisDataset.load(INPUT_TIDY_CSV, INPUT_PROFILES_CSV)
+    perform_descriptive_analysis(dataset, OUTPUT_DIR)
+    compute_top_tools(dataset, OUTPUT_DIR)
+    derive_focus_rq1b(dataset, OUTPUT_DIR)
+    job_task_coverage_per_job(dataset, OUTPUT_DIR)
+    perform_profile_analysis(dataset)
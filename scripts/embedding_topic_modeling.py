@@ -0,0 +1,267 @@
+import argparse
+from pathlib import Path
+
+import hdbscan
+import numpy as np
+import pandas as pd
+import umap
+from sklearn.feature_extraction.text import CountVectorizer
+from spacy.lang.en.stop_words import STOP_WORDS as en_stop
+from spacy.lang.nl.stop_words import STOP_WORDS as nl_stop
+
+from artifacts import read_artifact, write_artifact
+from topic_cache import digest
+
+# --- Configuration ---
+WORKSPACE_DIR = Path(__file__).resolve().parent.parent
+INPUT_DATA_CSV = WORKSPACE_DIR / "data" / "consolidated_deduplicated.csv"
+OUTPUT_DIR = WORKSPACE_DIR / "data" / "analysis_results"
+CACHE_DIR = WORKSPACE_DIR / "data" / "cache" / "embeddings"
+# Small multilingual model: the ads are a mix of Dutch and English.
+EMBEDDING_MODEL = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+BATCH_SIZE = 32
+UMAP_NEIGHBORS = 15
+UMAP_COMPONENTS = 5
+MIN_CLUSTER_SIZE = 15
+TOP_WORDS_PER_TOPIC = 15
+OUTLIER_TOPIC = -1
+SEED = 42
+
+custom_stopwords = en_stop.union(nl_stop)
+
+
+def load_corpus():
+    """The deduplicated job ads with the title and description combined in `full_text`."""
+    df = read_artifact(
+        INPUT_DATA_CSV, columns=["job_id", "Vacaturetitel", "Functieomschrijving"]
+    )
+    df["full_text"] = (
+        df["Vacaturetitel"].fillna("") + " " + df["Functieomschrijving"].fillna("")
+    )
+    return df
+
+
+class EmbeddingCache:
+    """
+    Sentence embeddings of one model, stored in a memory-mapped `.npy` file.
+
+    A companion table maps the hash of each embedded text to its row in the
+    array. New texts are appended by writing a larger array, so texts are
+    never embedded twice.
+    """
+
+    def __init__(self, cache_dir: Path, model_name: str):
+        key = digest({"model": model_name, "normalized": True}, size=8)
+        self.array_path = Path(cache_dir) / f"embeddings_{key}.npy"
+        self.index_path = Path(cache_dir) / f"embeddings_{key}.index.parquet"
+        self.rows = {}
+        self.embeddings = None
+        if self.array_path.exists() and self.index_path.exists():
+            index = pd.read_parquet(self.index_path)
+            self.rows = dict(zip(index["text_hash"], index["row"]))
+            self.embeddings = np.load(self.array_path, mmap_mode="r")
+
+    def missing(self, text_hashes):
+        return [h for h in dict.fromkeys(text_hashes) if h not in self.rows]
+
+    def append(self, text_hashes, embeddings: np.ndarray) -> None:
+        old_rows = 0 if self.embeddings is None else len(self.embeddings)
+        self.array_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.array_path.with_suffix(".tmp.npy")
+        combined = np.lib.format.open_memmap(
+            tmp_path,
+            mode="w+",
+            dtype=np.float32,
+            shape=(old_rows + len(embeddings), embeddings.shape[1]),
+        )
+        if old_rows:
+            combined[:old_rows] = self.embeddings
+        combined[old_rows:] = embeddings
+        combined.flush()
+        del combined
+        tmp_path.replace(self.array_path)
+
+        for offset, text_hash in enumerate(text_hashes):
+            self.rows[text_hash] = old_rows + offset
+        index = pd.DataFrame(
+            {"text_hash": list(self.rows), "row": list(self.rows.values())}
+        )
+        write_artifact(index, self.index_path, "parquet")
+        self.embeddings = np.load(self.array_path, mmap_mode="r")
+
+    def lookup(self, text_hashes) -> np.ndarray:
+        return np.asarray(self.embeddings[[self.rows[h] for h in text_hashes]])
+
+
+def embed_corpus(texts, model_name=EMBEDDING_MODEL, batch_size=BATCH_SIZE):
+    """Embeddings of `texts`, computing only those not in the cache yet."""
+    text_hashes = [digest(text) for text in texts]
+    cache = EmbeddingCache(CACHE_DIR, model_name)
+    missing = cache.missing(text_hashes)
+    num_unique = len(set(text_hashes))
+    print(f"{num_unique - len(missing)} of {num_unique} texts found in the embedding cache.")
+
+    if missing:
+        # Imported here so re-clustering cached embeddings does not load torch.
+        from sentence_transformers import SentenceTransformer
+
+        texts_by_hash = dict(zip(text_hashes, texts))
+        print(f"Embedding {len(missing)} texts with {model_name} on CPU...")
+        model = SentenceTransformer(model_name, device="cpu")
+        embeddings = model.encode(
+            [texts_by_hash[h] for h in missing],
+            batch_size=batch_size,
+            show_progress_bar=True,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+        )
+        cache.append(missing, embeddings.astype(np.float32))
+    return cache.lookup(text_hashes)
+
+
+def cluster_embeddings(embeddings, n_neighbors, n_components, min_cluster_size):
+    """Reduces the embeddings with UMAP and clusters them with HDBSCAN.
+
+    Returns one label per document; OUTLIER_TOPIC marks unclustered documents.
+    """
+    print(
+        f"Reducing {embeddings.shape[1]}-dimensional embeddings to "
+        f"{n_components} dimensions with UMAP..."
+    )
+    reducer = umap.UMAP(
+        n_neighbors=n_neighbors,
+        n_components=n_components,
+        min_dist=0.0,
+        metric="cosine",
+        random_state=SEED,
+    )
+    reduced = reducer.fit_transform(embeddings)
+
+    print(f"Clustering with HDBSCAN (min_cluster_size={min_cluster_size})...")
+    clusterer = hdbscan.HDBSCAN(
+        min_cluster_size=min_cluster_size,
+        metric="euclidean",
+        cluster_selection_method="eom",
+    )
+    return clusterer.fit_predict(reduced)
+
+
+def class_tfidf_topics(texts, labels, no_top_words=TOP_WORDS_PER_TOPIC):
+    """
+    The top words of each cluster by class-based TF-IDF.
+
+    All documents of a cluster are treated as one document; a word scores
+    high if it is frequent in the cluster and rare across clusters.
+    """
+    documents = pd.DataFrame({"text": texts, "topic": labels})
+    per_topic = documents.groupby("topic")["text"].apply(" ".join)
+    vectorizer = CountVectorizer(
+        stop_words=list(custom_stopwords), token_pattern=r"(?u)\b[^\W\d_]{3,}\b"
+    )
+    counts = vectorizer.fit_transform(per_topic.str.lower()).toarray().astype(float)
+
+    term_frequency = counts / counts.sum(axis=1, keepdims=True)
+    average_words = counts.sum(axis=1).mean()
+    idf = np.log(1 + average_words / counts.sum(axis=0))
+    scores = term_frequency * idf
+
+    feature_names = vectorizer.get_feature_names_out()
+    topics = {}
+    for topic_id, topic_scores in zip(per_topic.index, scores):
+        top_words = " | ".join(
+            feature_names[i] for i in topic_scores.argsort()[: -no_top_words - 1 : -1]
+        )
+        print(f"Topic {topic_id}: {top_words}")
+        topics[topic_id] = top_words
+    return topics
+
+
+def main(
+    model_name=EMBEDDING_MODEL,
+    batch_size=BATCH_SIZE,
+    n_neighbors=UMAP_NEIGHBORS,
+    n_components=UMAP_COMPONENTS,
+    min_cluster_size=MIN_CLUSTER_SIZE,
+):
+    """
+    Embedding-based alternative to topic_modeling.py: clusters the job ads by
+    meaning and writes the same topic outputs, with topic -1 for outliers.
+    """
+    OUTPUT_DIR.mkdir(exist_ok=True)
+
+    print("Loading data...")
+    df = load_corpus()
+
+    embeddings = embed_corpus(df["full_text"].tolist(), model_name, batch_size)
+    labels = cluster_embeddings(embeddings, n_neighbors, n_components, min_cluster_size)
+    num_topics = len(set(labels) - {OUTLIER_TOPIC})
+    num_outliers = int((labels == OUTLIER_TOPIC).sum())
+    print(f"Found {num_topics} topics; {num_outliers} job ads are outliers.")
+
+    print("\n--- Discovered Topics ---")
+    topics = class_tfidf_topics(df["full_text"].tolist(), labels)
+
+    df_topics = pd.DataFrame({"job_id": df["job_id"], "dominant_topic": labels})
+    output_topic_mapping_path = OUTPUT_DIR / "job_topic_mapping.csv"
+    df_topics.to_csv(output_topic_mapping_path, index=False)
+    print(f"Saved job-to-topic mapping to {output_topic_mapping_path}")
+
+    df_topic_defs = pd.DataFrame.from_dict(
+        topics, orient="index", columns=["top_words"]
+    )
+    df_topic_defs.index.name = "topic_id"
+    output_topic_defs_path = OUTPUT_DIR / "topic_definitions.csv"
+    df_topic_defs.to_csv(output_topic_defs_path)
+    print(f"Saved topic definitions to {output_topic_defs_path}")
+
+    output_path = OUTPUT_DIR / "topic_modeling_results.txt"
+    with open(output_path, "w", encoding="utf-8") as f:
+        f.write(
+            f"Embedding Topic Modeling Results ({num_topics} topics, "
+            f"{num_outliers} outliers in topic {OUTLIER_TOPIC})\n"
+        )
+        f.write("=" * 40 + "\n")
+        for topic_id, words in topics.items():
+            f.write(f"Topic {topic_id}: {words}\n")
+
+    print(f"\nSaved topic modeling results to {output_path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Discover topics by clustering sentence embeddings of the job ads.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "--model", default=EMBEDDING_MODEL, help="sentence-transformers model name."
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=BATCH_SIZE, help="Texts per encoding batch."
+    )
+    parser.add_argument(
+        "--umap-neighbors",
+        type=int,
+        default=UMAP_NEIGHBORS,
+        help="UMAP neighbourhood size; larger values give broader topics.",
+    )
+    parser.add_argument(
+        "--umap-components",
+        type=int,
+        default=UMAP_COMPONENTS,
+        help="Dimensions to reduce the embeddings to before clustering.",
+    )
+    parser.add_argument(
+        "--min-cluster-size",
+        type=int,
+        default=MIN_CLUSTER_SIZE,
+        help="Smallest group of job ads HDBSCAN reports as a topic.",
+    )
+    args = parser.parse_args()
+
+    main(
+        model_name=args.model,
+        batch_size=args.batch_size,
+        n_neighbors=args.umap_neighbors,
+        n_components=args.umap_components,
+        min_cluster_size=args.min_cluster_size,
+    )
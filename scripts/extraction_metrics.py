@@ -0,0 +1,166 @@
+"""Structured per-call metrics for the extraction agent, written as JSONL."""
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+import numpy as np
+
+# Phases of one call, in order. "throttle" is time spent waiting for the rate
+# limiter; "repair" is stripping code fences before `json.loads` ("parse").
+PHASES = ["prompt_build", "throttle", "network", "repair", "parse", "write"]
+PERCENTILES = [50, 95, 99]
+
+
+@dataclass
+class CallMetrics:
+    """Timings and usage of one request (a single ad or a batch of ads)."""
+
+    job_ids: List[int]
+    kind: str = "single"
+    cached: bool = False
+    ok: bool = False
+    error: str | None = None
+    prompt_tokens: int | None = None
+    output_tokens: int | None = None
+    retries: int = 0
+    bytes_written: int = 0
+    phases: Dict[str, float] = field(default_factory=dict)
+    started: float = field(default_factory=time.perf_counter, repr=False)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Adds the wall time of the `with` block to phase `name`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def add_time(self, name: str, seconds: float) -> None:
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def to_record(self) -> Dict[str, Any]:
+        record = asdict(self)
+        del record["started"], record["phases"]
+        record["timestamp"] = time.time()
+        record["total_s"] = time.perf_counter() - self.started
+        for name in PHASES:
+            record[f"{name}_s"] = self.phases.get(name, 0.0)
+        return record
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {f"p{p}": float("nan") for p in PERCENTILES}
+    return {
+        f"p{p}": float(v) for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))
+    }
+
+
+class MetricsRecorder:
+    """
+    Appends one JSON line per call to `path` and summarizes the run.
+
+    Prices are in currency units per million tokens; when given, the summary
+    includes an estimated spend.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        input_price_per_m: float | None = None,
+        output_price_per_m: float | None = None,
+    ):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.input_price_per_m = input_price_per_m
+        self.output_price_per_m = output_price_per_m
+        self.records: List[Dict[str, Any]] = []
+        self.started = time.perf_counter()
+        self.lock = threading.Lock()
+        self.file = open(self.path, "a", encoding="utf-8")
+
+    def record(self, call: CallMetrics) -> None:
+        record = call.to_record()
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self.lock:
+            self.records.append(record)
+            self.file.write(line)
+            self.file.flush()
+
+    def summary(self) -> Dict[str, Any]:
+        with self.lock:
+            records = list(self.records)
+        elapsed = time.perf_counter() - self.started
+        api_calls = [r for r in records if not r["cached"]]
+        prompt_tokens = sum(r["prompt_tokens"] or 0 for r in api_calls)
+        output_tokens = sum(r["output_tokens"] or 0 for r in api_calls)
+
+        phases = {"total": percentiles([r["total_s"] for r in records])}
+        for name in PHASES:
+            # Network and throttling only happen for calls that reached the API.
+            source = api_calls if name in ("throttle", "network") else records
+            phases[name] = percentiles([r[f"{name}_s"] for r in source])
+
+        call_tokens_per_s = [
+            r["output_tokens"] / r["network_s"]
+            for r in api_calls
+            if r["output_tokens"] and r["network_s"] > 0
+        ]
+        summary = {
+            "path": str(self.path),
+            "calls": len(records),
+            "api_calls": len(api_calls),
+            "cached_calls": len(records) - len(api_calls),
+            "failed_calls": sum(1 for r in records if not r["ok"]),
+            "retries": sum(r["retries"] for r in records),
+            "bytes_written": sum(r["bytes_written"] for r in records),
+            "elapsed_s": elapsed,
+            "phases": phases,
+            "prompt_tokens": prompt_tokens,
+            "output_tokens": output_tokens,
+            "tokens_per_s": (prompt_tokens + output_tokens) / elapsed if elapsed > 0 else 0.0,
+            "output_tokens_per_s_per_call": percentiles(call_tokens_per_s),
+            "estimated_cost": None,
+        }
+        if self.input_price_per_m is not None or self.output_price_per_m is not None:
+            summary["estimated_cost"] = (
+                prompt_tokens * (self.input_price_per_m or 0)
+                + output_tokens * (self.output_price_per_m or 0)
+            ) / 1e6
+        return summary
+
+    def print_summary(self) -> None:
+        summary = self.summary()
+        print(f"\n--- Call Metrics: {summary['path']} ---")
+        print(
+            f"Calls: {summary['calls']} ({summary['api_calls']} API, "
+            f"{summary['cached_calls']} cached, {summary['failed_calls']} failed), "
+            f"retries: {summary['retries']}, written: {summary['bytes_written'] / 1e6:.2f} MB"
+        )
+        print(f"{'phase (ms)':<14}" + "".join(f"{f'p{p}':>10}" for p in PERCENTILES))
+        for name, values in summary["phases"].items():
+            print(
+                f"{name:<14}"
+                + "".join(f"{values[f'p{p}'] * 1000:>10.1f}" for p in PERCENTILES)
+            )
+        print(
+            f"Tokens: {summary['prompt_tokens']} prompt, {summary['output_tokens']} output, "
+            f"{summary['tokens_per_s']:.1f} tokens/s overall"
+        )
+        per_call = summary["output_tokens_per_s_per_call"]
+        print(
+            "Output tokens/s per call: "
+            + ", ".join(f"p{p} {per_call[f'p{p}']:.1f}" for p in PERCENTILES)
+        )
+        if summary["estimated_cost"] is not None:
+            print(f"Estimated cost: {summary['estimated_cost']:.4f}")
+
+    def close(self) -> None:
+        with self.lock:
+            self.file.close()
@@ -0,0 +1,109 @@
+"""
+Stable job_ids derived from the content of a job ad.
+
+Every ad gets a content key: a hash of its normalized link, title, employer,
+location and date found, plus an occurrence number for ads that share all of
+these. A persistent mapping table assigns each key a sequential integer id the
+first time it is seen and returns the same id on every later run, so adding
+an export or changing the deduplication columns does not renumber existing ads
+(and their cached `analysis_job_{id}.json` files stay valid).
+"""
+
+import hashlib
+import os
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List
+
+import pandas as pd
+
+WORKSPACE_DIR = Path(__file__).resolve().parent.parent
+JOB_ID_MAP_PATH = WORKSPACE_DIR / "data" / "job_id_map.csv"
+
+IDENTITY_COLUMNS = [
+    "Vacaturelink (origineel)",
+    "Vacaturetitel",
+    "Organisatienaam",
+    "Standplaats",
+    "Datum gevonden",
+]
+
+WHITESPACE = re.compile(r"\s+")
+
+
+def normalize(value) -> str:
+    """Case- and whitespace-insensitive text of one field; missing values are empty."""
+    if pd.isna(value):
+        return ""
+    if isinstance(value, pd.Timestamp):
+        # Dates parsed from the exports read the same as their CSV text.
+        value = value.strftime("%Y-%m-%d") if value == value.normalize() else value
+    return WHITESPACE.sub(" ", str(value)).strip().casefold()
+
+
+def normalize_link(value) -> str:
+    link = normalize(value)
+    link = re.sub(r"^https?://(www\.)?", "", link)
+    return link.rstrip("/")
+
+
+def content_key(row) -> str:
+    """Hex digest identifying one ad by the values of IDENTITY_COLUMNS in `row`."""
+    link, *fields = row
+    key = "\x1f".join([normalize_link(link)] + [normalize(v) for v in fields])
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class JobIdRegistry:
+    """
+    Persistent mapping of content keys to integer job_ids.
+
+    The table is a CSV with `content_key` and `job_id` columns. New keys get
+    the next unused id in order of first occurrence, so bootstrapping from an
+    empty table reproduces positional ids.
+    """
+
+    def __init__(self, path: Path = JOB_ID_MAP_PATH):
+        self.path = Path(path)
+        self.ids: Dict[str, int] = {}
+        if self.path.exists():
+            table = pd.read_csv(self.path, dtype={"content_key": str, "job_id": "int64"})
+            self.ids = dict(zip(table["content_key"], table["job_id"]))
+        self.next_id = max(self.ids.values(), default=-1) + 1
+        self.new_ids = 0
+        # Ads sharing a content key are told apart by their occurrence number.
+        self.occurrences: Counter = Counter()
+
+    def assign(self, df: pd.DataFrame) -> List[int]:
+        """The job_ids of the rows of `df`, registering unseen ads.
+
+        Occurrence numbers carry over between calls, so a file can be
+        assigned chunk by chunk.
+        """
+        missing = [c for c in IDENTITY_COLUMNS if c not in df.columns]
+        if missing:
+            raise KeyError(f"Cannot derive job_ids, missing columns: {missing}")
+        job_ids = []
+        for row in df[IDENTITY_COLUMNS].itertuples(index=False, name=None):
+            key = content_key(row)
+            occurrence = self.occurrences[key]
+            self.occurrences[key] += 1
+            if occurrence:
+                key = f"{key}-{occurrence}"
+            if key not in self.ids:
+                self.ids[key] = self.next_id
+                self.next_id += 1
+                self.new_ids += 1
+            job_ids.append(self.ids[key])
+        return job_ids
+
+    def save(self) -> None:
+        """Writes the mapping table, sorted by job_id, via a temporary file."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        table = pd.DataFrame(
+            {"content_key": list(self.ids), "job_id": list(self.ids.values())}
+        ).sort_values("job_id")
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        table.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,186 @@
+"""Pluggable LLM backends for the job ad extraction agent."""
+
+import json
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Protocol
+
+# Marks the start of each job description in a batch-mode prompt.
+BATCH_JOB_HEADER = "JOB_ID: {job_id}"
+BATCH_JOB_PATTERN = re.compile(r"^JOB_ID: (\d+)\s*$", re.MULTILINE)
+
+
+@dataclass
+class BackendResponse:
+    """The text of a model response plus the token usage reported for it."""
+
+    text: str
+    prompt_tokens: int | None = None
+    output_tokens: int | None = None
+
+    @property
+    def total_tokens(self) -> int | None:
+        if self.prompt_tokens is None and self.output_tokens is None:
+            return None
+        return (self.prompt_tokens or 0) + (self.output_tokens or 0)
+
+
+class LLMBackend(Protocol):
+    """Anything that turns a per-request prompt into a `BackendResponse`."""
+
+    name: str
+
+    def generate(self, prompt: str) -> BackendResponse: ...
+
+
+class GeminiBackend:
+    """Wraps the run's shared `genai.GenerativeModel`."""
+
+    def __init__(self, model: Any, name: str):
+        self.model = model
+        self.name = name
+
+    def generate(self, prompt: str) -> BackendResponse:
+        response = self.model.generate_content(prompt)
+        usage = getattr(response, "usage_metadata", None)
+        return BackendResponse(
+            text=response.text,
+            prompt_tokens=getattr(usage, "prompt_token_count", None),
+            output_tokens=getattr(usage, "candidates_token_count", None),
+        )
+
+
+class MockBackendError(Exception):
+    """A simulated API error carrying an HTTP status `code` like google.api_core errors."""
+
+    def __init__(self, code: int, message: str):
+        super().__init__(f"{code} {message}")
+        self.code = code
+
+
+MOCK_PROFILES = ["GenAI Engineer", "ML Engineer", "Ambiguous"]
+MOCK_TASKS = [
+    "TASK1: Business Understanding",
+    "TASK2: Data Engineering",
+    "TASK3: Modeling",
+    "TASK4: Software Development",
+    "TASK5: Operations Engineering (MLOps)",
+]
+MOCK_TECHNOLOGIES = [
+    "TECH1: Programming Languages",
+    "TECH2: Cloud Platforms & Services",
+    "TECH3: LLM / Generative Models",
+    "TECH6: MLOps & Data Pipelines",
+    "TECH10: Data Modeling",
+]
+MOCK_SKILLS = [
+    "SKILL1: Communication & Collaboration",
+    "SKILL2: Learning & Adaptability",
+    "SKILL3: Problem Solving & Pragmatism",
+]
+
+
+class MockBackend:
+    """
+    An offline stand-in that returns schema-valid `Analysis` JSON.
+
+    Batch-mode prompts (job descriptions under `JOB_ID: <id>` headers) get a
+    list of `{job_id, analysis}` items. Latency, retryable API errors (429/503)
+    and malformed JSON are injected at configurable rates so the extraction
+    loop (throughput, retries, resume) can be exercised without network access
+    or an API key.
+    """
+
+    name = "mock"
+
+    def __init__(
+        self,
+        latency: float = 0.5,
+        latency_jitter: float = 0.25,
+        error_rate: float = 0.0,
+        malformed_rate: float = 0.0,
+        seed: int | None = None,
+    ):
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.malformed_rate = malformed_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def _draw(self) -> tuple[float, float, float]:
+        # random.Random is not safe to share between threads without a lock.
+        with self.lock:
+            return self.rng.random(), self.rng.random(), self.rng.uniform(-1, 1)
+
+    def generate(self, prompt: str) -> BackendResponse:
+        error_draw, malformed_draw, jitter = self._draw()
+        time.sleep(max(0.0, self.latency + jitter * self.latency_jitter))
+
+        if error_draw < self.error_rate:
+            code = 429 if error_draw < self.error_rate / 2 else 503
+            raise MockBackendError(code, "simulated API error")
+
+        sections = BATCH_JOB_PATTERN.split(prompt)
+        if len(sections) > 1:
+            # split() alternates [preamble, id, text, id, text, ...].
+            payload: Any = [
+                {"job_id": int(job_id), "analysis": self.analysis_for(text)}
+                for job_id, text in zip(sections[1::2], sections[2::2])
+            ]
+        else:
+            payload = self.analysis_for(prompt)
+        text = json.dumps(payload, ensure_ascii=False)
+        if malformed_draw < self.malformed_rate:
+            # Truncated output, as when max_output_tokens cuts a response short.
+            text = text[: len(text) // 2]
+
+        return BackendResponse(
+            text=text,
+            prompt_tokens=len(prompt) // 4 + 1,
+            output_tokens=len(text) // 4 + 1,
+        )
+
+    def analysis_for(self, prompt: str) -> Dict[str, Any]:
+        """Builds a deterministic analysis from phrases found in the prompt."""
+        rng = random.Random(prompt)
+        sentences = [
+            s.strip()
+            for s in re.split(r"[.\n]+", prompt)
+            if len(s.split()) >= 4 and "**" not in s
+        ] or ["No description provided"]
+        words = sorted({w for w in re.findall(r"[A-Za-z][\w+#.-]{2,}", prompt)})
+
+        def phrase() -> str:
+            return " ".join(rng.choice(sentences).split()[:12])
+
+        return {
+            "profile_classification": {
+                "profile": rng.choice(MOCK_PROFILES),
+                "rationale": "Mock analysis generated offline.",
+            },
+            "thematic_analysis": {
+                "job_tasks": [
+                    {
+                        "phrase": phrase(),
+                        "category": rng.choice(MOCK_TASKS),
+                        "justification": "Mock justification.",
+                    }
+                    for _ in range(rng.randint(1, 5))
+                ],
+                "technologies": [
+                    {
+                        "phrase": rng.choice(words) if words else "Python",
+                        "category": rng.choice(MOCK_TECHNOLOGIES),
+                    }
+                    for _ in range(rng.randint(0, 6))
+                ],
+                "soft_skills": [
+                    {"phrase": phrase(), "category": rng.choice(MOCK_SKILLS)}
+                    for _ in range(rng.randint(0, 3))
+                ],
+            },
+        }
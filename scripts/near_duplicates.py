@@ -0,0 +1,166 @@
+"""
+Near-duplicate detection for job ad descriptions with MinHash and LSH banding.
+
+Each description is reduced to a set of word shingles, summarised by a MinHash
+signature, and the signatures are split into bands; ads sharing any band
+bucket become candidates, which are accepted if their estimated Jaccard
+similarity reaches the threshold. Accepted pairs are merged into clusters
+with union-find. Time and memory grow linearly with the number of ads.
+"""
+
+import re
+import zlib
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Prime just above 2**32 (not a Mersenne prime; reduced with a plain modulo).
+# Shingle hashes are 32-bit, coefficients below 2**31,
+# so a * x + b stays within uint64.
+HASH_PRIME = np.uint64((1 << 32) + 15)
+NUM_PERM = 128
+SHINGLE_SIZE = 5
+SEED = 42
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def shingle_hashes(text, shingle_size: int = SHINGLE_SIZE) -> np.ndarray:
+    """32-bit hashes of the lower-cased word shingles of `text`."""
+    if not isinstance(text, str):
+        return np.empty(0, dtype=np.uint64)
+    tokens = TOKEN_PATTERN.findall(text.lower())
+    if not tokens:
+        return np.empty(0, dtype=np.uint64)
+    shingles = {
+        " ".join(tokens[i : i + shingle_size])
+        for i in range(max(len(tokens) - shingle_size + 1, 1))
+    }
+    return np.fromiter(
+        (zlib.crc32(s.encode("utf-8")) for s in shingles),
+        dtype=np.uint64,
+        count=len(shingles),
+    )
+
+
+def minhash_signatures(
+    texts: List, num_perm: int = NUM_PERM, seed: int = SEED
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    MinHash signatures of `texts`, shape (len(texts), num_perm).
+
+    Also returns a mask of texts that produced at least one shingle; rows of
+    empty texts are left at the maximum value and must not be compared.
+    """
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, 1 << 31, size=num_perm, dtype=np.uint64)
+    b = rng.integers(0, 1 << 31, size=num_perm, dtype=np.uint64)
+    signatures = np.full((len(texts), num_perm), HASH_PRIME, dtype=np.uint64)
+    has_shingles = np.zeros(len(texts), dtype=bool)
+    for i, text in enumerate(texts):
+        hashes = shingle_hashes(text)
+        if hashes.size == 0:
+            continue
+        permuted = (np.outer(a, hashes) + b[:, None]) % HASH_PRIME
+        signatures[i] = permuted.min(axis=1)
+        has_shingles[i] = True
+    return signatures, has_shingles
+
+
+def _probability_integral(threshold: float, bands: int, rows: int, above: bool) -> float:
+    """Area under the LSH collision curve below (false positives) or above
+    (false negatives) the threshold."""
+    if above:
+        xs = np.linspace(threshold, 1.0, 200)
+        ys = 1 - (1 - (1 - xs**rows) ** bands)
+    else:
+        xs = np.linspace(0.0, threshold, 200)
+        ys = 1 - (1 - xs**rows) ** bands
+    return float(ys.mean() * (xs[-1] - xs[0]))
+
+
+def optimal_bands(threshold: float, num_perm: int = NUM_PERM) -> Tuple[int, int]:
+    """
+    The (bands, rows) split of a `num_perm` signature that minimises the sum
+    of the false positive and false negative probability mass at `threshold`.
+    """
+    best, best_error = (1, num_perm), float("inf")
+    for bands in range(1, num_perm + 1):
+        for rows in range(1, num_perm // bands + 1):
+            error = _probability_integral(
+                threshold, bands, rows, above=False
+            ) + _probability_integral(threshold, bands, rows, above=True)
+            if error < best_error:
+                best, best_error = (bands, rows), error
+    return best
+
+
+class UnionFind:
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+
+    def find(self, i: int) -> int:
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i: int, j: int) -> None:
+        root_i, root_j = self.find(i), self.find(j)
+        if root_i != root_j:
+            # The smaller index, i.e. the first occurrence, becomes the root.
+            self.parent[max(root_i, root_j)] = min(root_i, root_j)
+
+
+def near_duplicate_clusters(
+    texts: List, threshold: float = 0.8, num_perm: int = NUM_PERM
+) -> np.ndarray:
+    """
+    Assigns every text the position of the first text in its near-duplicate
+    cluster; texts without near duplicates (or without any words) map to
+    their own position.
+    """
+    signatures, has_shingles = minhash_signatures(texts, num_perm)
+    bands, rows = optimal_bands(threshold, num_perm)
+    clusters = UnionFind(len(texts))
+    candidates = np.flatnonzero(has_shingles)
+    for band in range(bands):
+        band_values = signatures[:, band * rows : (band + 1) * rows]
+        buckets = {}
+        for i in candidates:
+            buckets.setdefault(band_values[i].tobytes(), []).append(i)
+        for members in buckets.values():
+            # Compare against the bucket's first member only, so that large
+            # buckets stay linear; other pairs are found via other bands.
+            first = members[0]
+            for other in members[1:]:
+                similarity = np.mean(signatures[first] == signatures[other])
+                if similarity >= threshold:
+                    clusters.union(first, other)
+    return np.array([clusters.find(i) for i in range(len(texts))])
+
+
+def mark_near_duplicates(
+    df: pd.DataFrame,
+    text_column: str = "Functieomschrijving",
+    threshold: float = 0.8,
+    keep_representatives: bool = False,
+) -> pd.DataFrame:
+    """
+    Adds a `near_duplicate_cluster` column holding, for each row, the job_id
+    of the first row of its cluster.
+
+    With `keep_representatives`, only that first row of each cluster is kept.
+    """
+    df = df.reset_index(drop=True)
+    roots = near_duplicate_clusters(df[text_column].tolist(), threshold)
+    num_clusters = len(np.unique(roots))
+    print(
+        f"Found {len(df) - num_clusters} near-duplicate rows in "
+        f"{(np.bincount(roots) > 1).sum()} clusters (Jaccard >= {threshold})."
+    )
+    df["near_duplicate_cluster"] = df["job_id"].to_numpy()[roots]
+    if keep_representatives:
+        df = df[roots == np.arange(len(df))].reset_index(drop=True)
+    return df
@@ -0,0 +1,192 @@
+"""Client-side rate limiting, retries and adaptive concurrency for LLM calls."""
+
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, TypeVar
+
+T = TypeVar("T")
+
+# HTTP status codes worth retrying: quota exhaustion and transient server errors.
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """
+    A thread-safe token bucket refilled continuously at `per_minute / 60` units/s.
+
+    A bucket with `per_minute <= 0` is unlimited and never blocks.
+    """
+
+    def __init__(self, per_minute: float):
+        self.per_minute = per_minute
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.per_minute <= 0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def acquire(self, amount: float = 1.0) -> float:
+        """Blocks until `amount` units are available and takes them. Returns seconds waited."""
+        if self.unlimited:
+            return 0.0
+        # A single request larger than the whole budget would otherwise wait forever.
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return waited
+                sleep_for = (amount - self.tokens) / self.rate
+            time.sleep(sleep_for)
+            waited += sleep_for
+
+    def adjust(self, amount: float) -> None:
+        """Charges (positive) or refunds (negative) units after the fact."""
+        if self.unlimited:
+            return
+        with self.lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens - amount)
+
+
+class RateLimiter:
+    """Combines a requests-per-minute and a tokens-per-minute budget."""
+
+    def __init__(self, requests_per_minute: float = 0, tokens_per_minute: float = 0):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+
+    def acquire(self, estimated_tokens: int) -> float:
+        """Waits until one request of `estimated_tokens` fits both budgets."""
+        waited = self.requests.acquire(1)
+        waited += self.tokens.acquire(estimated_tokens)
+        return waited
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: int | None) -> None:
+        """Reconciles the token budget with the usage reported by the API."""
+        if actual_tokens is not None:
+            self.tokens.adjust(actual_tokens - estimated_tokens)
+
+
+class AdaptiveConcurrency:
+    """
+    An adjustable semaphore using additive-increase / multiplicative-decrease.
+
+    The limit is halved whenever `error_threshold` retryable errors occur in a
+    row and grows back by one slot after `limit` consecutive successes, up to
+    `max_limit`.
+    """
+
+    def __init__(self, max_limit: int, error_threshold: int = 3):
+        self.max_limit = max_limit
+        self.limit = max_limit
+        self.error_threshold = error_threshold
+        self.in_flight = 0
+        self.consecutive_errors = 0
+        self.consecutive_successes = 0
+        self.condition = threading.Condition()
+
+    def __enter__(self) -> "AdaptiveConcurrency":
+        with self.condition:
+            while self.in_flight >= self.limit:
+                self.condition.wait()
+            self.in_flight += 1
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        with self.condition:
+            self.in_flight -= 1
+            self.condition.notify_all()
+
+    def on_success(self) -> None:
+        with self.condition:
+            self.consecutive_errors = 0
+            self.consecutive_successes += 1
+            if self.limit < self.max_limit and self.consecutive_successes >= self.limit:
+                self.limit += 1
+                self.consecutive_successes = 0
+                self.condition.notify_all()
+
+    def on_error(self) -> None:
+        with self.condition:
+            self.consecutive_successes = 0
+            self.consecutive_errors += 1
+            if self.consecutive_errors >= self.error_threshold and self.limit > 1:
+                self.limit = max(1, self.limit // 2)
+                self.consecutive_errors = 0
+                print(f"Too many errors; reducing concurrency to {self.limit}.")
+
+
+@dataclass
+class RetryPolicy:
+    """Jittered exponential backoff settings ("full jitter")."""
+
+    max_retries: int = 6
+    base_delay: float = 2.0
+    max_delay: float = 60.0
+
+    def delay(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+
+def is_retryable_error(exc: Exception) -> bool:
+    """Returns True for 429/5xx API errors and transient network failures."""
+    if isinstance(exc, (ConnectionError, TimeoutError)):
+        return True
+    # google.api_core exceptions expose the HTTP status as `code`.
+    code = getattr(exc, "code", None)
+    if isinstance(code, int):
+        return code in RETRYABLE_STATUS_CODES
+    return False
+
+
+def call_with_retries(
+    func: Callable[[], T],
+    policy: RetryPolicy,
+    concurrency: AdaptiveConcurrency | None = None,
+    description: str = "request",
+) -> tuple[T, int]:
+    """
+    Calls `func`, retrying retryable errors with jittered exponential backoff.
+
+    Non-retryable errors, and the last retryable error once `max_retries` is
+    exhausted, are re-raised.
+
+    Returns:
+        A tuple of (result, number of retries used).
+    """
+    attempt = 0
+    while True:
+        try:
+            result = func()
+        except Exception as e:
+            if not is_retryable_error(e):
+                raise
+            if concurrency is not None:
+                concurrency.on_error()
+            if attempt >= policy.max_retries:
+                raise
+            sleep_for = policy.delay(attempt)
+            attempt += 1
+            print(
+                f"Retryable error for {description} ({e}); "
+                f"retry {attempt}/{policy.max_retries} in {sleep_for:.1f}s."
+            )
+            time.sleep(sleep_for)
+            continue
+        if concurrency is not None:
+            concurrency.on_success()
+        return result, attempt
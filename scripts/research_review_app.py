@@ -11,9 +11,12 @@ from typing import Any, Dict, List
 import pandas as pd
 import streamlit as st
 
+from analysis_store import AnalysisStore
+
 # --- Configuration ---
 WORKSPACE_DIR = Path(__file__).resolve().parent.parent
 ANALYSIS_DIR = WORKSPACE_DIR / "data" / "automated_analysis"
+ANALYSIS_STORE_DIR = WORKSPACE_DIR / "data" / "automated_analysis_store"
 REVIEW_LOG_PATH = WORKSPACE_DIR / "data" / "analysis_review_log.csv"
 DEFAULT_SAMPLE_SIZE = 25
 RIGOR_OPTIONS = [
@@ -24,9 +27,34 @@ RIGOR_OPTIONS = [
 
 
 # --- Data Loading Utilities ---
+def build_record(payload: Dict[str, Any], file_name: str, file_path: str) -> Dict[str, Any]:
+    """Flatten one analysis payload into the fields shown in the review UI."""
+    job_details: Dict[str, Any] = payload.get("job_details", {})
+    analysis: Dict[str, Any] = payload.get("analysis", {})
+    profile_block: Dict[str, Any] = analysis.get("profile_classification", {})
+    thematic: Dict[str, Any] = analysis.get("thematic_analysis", {})
+
+    return {
+        "job_id": payload.get("job_id"),
+        "file_name": file_name,
+        "file_path": file_path,
+        "job_title": job_details.get("Vacaturetitel") or job_details.get("job_title"),
+        "employer": job_details.get("Organisatienaam"),
+        "location": job_details.get("Standplaats") or job_details.get("Gemeente"),
+        "full_text": job_details.get("full_text")
+        or job_details.get("Functieomschrijving", ""),
+        "profile": profile_block.get("profile", "Unknown"),
+        "profile_rationale": profile_block.get("rationale", ""),
+        "job_tasks": thematic.get("job_tasks", []),
+        "soft_skills": thematic.get("soft_skills", []),
+        "technologies": thematic.get("technologies", []),
+        "raw_payload": payload,
+    }
+
+
 @st.cache_data(show_spinner=False)
-def load_analysis_records() -> List[Dict[str, Any]]:
-    """Return the parsed automated analysis records."""
+def load_json_records() -> List[Dict[str, Any]]:
+    """Return the parsed `analysis_job_*.json` files."""
     records: List[Dict[str, Any]] = []
     for path in sorted(ANALYSIS_DIR.glob("analysis_job_*.json")):
         try:
@@ -35,33 +63,48 @@ def load_analysis_records() -> List[Dict[str, Any]]:
             st.warning(f"Skipping {path.name}: could not parse JSON.")
             continue
 
-        job_details: Dict[str, Any] = payload.get("job_details", {})
-        analysis: Dict[str, Any] = payload.get("analysis", {})
-        profile_block: Dict[str, Any] = analysis.get("profile_classification", {})
-        thematic: Dict[str, Any] = analysis.get("thematic_analysis", {})
-
-        record: Dict[str, Any] = {
-            "job_id": payload.get("job_id"),
-            "file_name": path.name,
-            "file_path": str(path.relative_to(WORKSPACE_DIR)),
-            "job_title": job_details.get("Vacaturetitel")
-            or job_details.get("job_title"),
-            "employer": job_details.get("Organisatienaam"),
-            "location": job_details.get("Standplaats") or job_details.get("Gemeente"),
-            "full_text": job_details.get("full_text")
-            or job_details.get("Functieomschrijving", ""),
-            "profile": profile_block.get("profile", "Unknown"),
-            "profile_rationale": profile_block.get("rationale", ""),
-            "job_tasks": thematic.get("job_tasks", []),
-            "soft_skills": thematic.get("soft_skills", []),
-            "technologies": thematic.get("technologies", []),
-            "raw_payload": payload,
-        }
-        records.append(record)
+        records.append(
+            build_record(payload, path.name, str(path.relative_to(WORKSPACE_DIR)))
+        )
 
     return records
 
 
+@st.cache_data(show_spinner=False)
+def load_store_records() -> List[Dict[str, Any]]:
+    """Return the latest record of every job in the append-only JSONL store.
+
+    The store is opened read-only, so the app can run next to an extraction
+    run that is still appending to it.
+    """
+    records: List[Dict[str, Any]] = []
+    if not ANALYSIS_STORE_DIR.exists():
+        return records
+
+    store = AnalysisStore(ANALYSIS_STORE_DIR, read_only=True)
+    try:
+        for payload in store.iter_records():
+            job_id = payload.get("job_id")
+            records.append(
+                build_record(
+                    payload,
+                    f"analysis_job_{job_id}.json",
+                    store.describe(job_id).replace(f"{WORKSPACE_DIR}/", ""),
+                )
+            )
+    finally:
+        store.close()
+    return records
+
+
+# Where the reviewed analyses are read from; the JSON files are the default
+# output of the extraction agent, the store is written with `--sink jsonl`.
+ANALYSIS_SOURCES = {
+    "JSON files": (load_json_records, ANALYSIS_DIR),
+    "JSONL store": (load_store_records, ANALYSIS_STORE_DIR),
+}
+
+
 @st.cache_data(show_spinner=False)
 def load_review_log() -> pd.DataFrame:
     """Load existing manual review decisions if they exist."""
@@ -119,11 +162,18 @@ st.markdown(
     "manual scientific rigor assessments."
 )
 
-records = load_analysis_records()
+source = st.sidebar.radio(
+    "Analysis source",
+    list(ANALYSIS_SOURCES),
+    help="Per-job JSON files, or the JSONL store written with `--sink jsonl`.",
+)
+load_records, source_dir = ANALYSIS_SOURCES[source]
+records = load_records()
 if not records:
     st.error(
-        "No automated analysis files were found. Ensure the pipeline has produced JSON files "
-        "in `data/automated_analysis`."
+        f"No automated analyses were found in the {source.lower()} at "
+        f"`{source_dir.relative_to(WORKSPACE_DIR)}`. Ensure the pipeline has produced "
+        "them, or choose the other analysis source."
     )
     st.stop()
 
@@ -0,0 +1,187 @@
+"""Content-addressed on-disk cache for LLM responses, backed by SQLite."""
+
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+
+def normalize_text(text: str) -> str:
+    """Collapses whitespace so reformatted copies of the same ad share a cache entry."""
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def make_cache_key(
+    model_name: str,
+    generation_config: Dict[str, Any],
+    system_instruction: str,
+    job_text: str,
+) -> str:
+    """
+    Builds the cache key for one request.
+
+    The key covers everything that determines the response: the model name, the
+    generation config, a digest of the system instruction (instructions plus
+    coding book) and the normalized ad text. Editing the coding book or
+    switching models therefore misses the cache, while renumbered or repeated
+    ads hit it.
+    """
+    config = {
+        k: (getattr(v, "__name__", repr(v)) if k == "response_schema" else v)
+        for k, v in generation_config.items()
+    }
+    payload = json.dumps(
+        {
+            "model": model_name,
+            "generation_config": config,
+            "system_instruction": hashlib.sha256(
+                system_instruction.encode("utf-8")
+            ).hexdigest(),
+            "text": hashlib.sha256(
+                normalize_text(job_text).encode("utf-8")
+            ).hexdigest(),
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    A thread-safe SQLite cache of raw response texts.
+
+    Entries are evicted least-recently-used first once the stored responses
+    exceed `max_bytes`.
+    """
+
+    def __init__(self, path: Path, max_bytes: int | None = None):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses (last_used)"
+        )
+        self.conn.commit()
+
+    def get(self, key: str) -> str | None:
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT response FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.conn.execute(
+                "UPDATE responses SET last_used = ?, hits = hits + 1 WHERE key = ?",
+                (time.time(), key),
+            )
+            self.conn.commit()
+            return row[0]
+
+    def put(self, key: str, model_name: str, response_text: str) -> None:
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                """
+                INSERT OR REPLACE INTO responses
+                    (key, model, response, size, created_at, last_used, hits)
+                VALUES (?, ?, ?, ?, ?, ?, 0)
+                """,
+                (key, model_name, response_text, len(response_text.encode("utf-8")), now, now),
+            )
+            self.conn.commit()
+
+    def evict(self, max_bytes: int | None = None) -> int:
+        """Deletes least-recently-used entries until the cache fits `max_bytes`."""
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        if max_bytes is None:
+            return 0
+        with self.lock:
+            total = self.conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()[0]
+            if total <= max_bytes:
+                return 0
+            evicted = 0
+            rows = self.conn.execute(
+                "SELECT key, size FROM responses ORDER BY last_used ASC"
+            ).fetchall()
+            stale = []
+            for key, size in rows:
+                if total <= max_bytes:
+                    break
+                stale.append((key,))
+                total -= size
+                evicted += 1
+            self.conn.executemany("DELETE FROM responses WHERE key = ?", stale)
+            self.conn.commit()
+            self.conn.execute("VACUUM")
+        return evicted
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            entries, total, total_hits = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(hits), 0) FROM responses"
+            ).fetchone()
+            per_model = self.conn.execute(
+                "SELECT model, COUNT(*), SUM(size) FROM responses GROUP BY model ORDER BY model"
+            ).fetchall()
+        return {
+            "path": str(self.path),
+            "entries": entries,
+            "bytes": total,
+            "max_bytes": self.max_bytes,
+            "lifetime_hits": total_hits,
+            "session_hits": self.hits,
+            "session_misses": self.misses,
+            "per_model": [
+                {"model": m, "entries": n, "bytes": b} for m, n, b in per_model
+            ],
+        }
+
+    def print_stats(self) -> None:
+        stats = self.stats()
+        print(f"--- Response Cache: {stats['path']} ---")
+        limit = (
+            f" / {stats['max_bytes'] / 1e6:.1f} MB"
+            if stats["max_bytes"] is not None
+            else ""
+        )
+        print(f"Entries: {stats['entries']}")
+        print(f"Size: {stats['bytes'] / 1e6:.1f} MB{limit}")
+        print(f"Lifetime hits: {stats['lifetime_hits']}")
+        lookups = stats["session_hits"] + stats["session_misses"]
+        if lookups:
+            print(
+                f"This run: {stats['session_hits']} hits, {stats['session_misses']} misses "
+                f"({stats['session_hits'] / lookups:.0%} hit rate)"
+            )
+        for row in stats["per_model"]:
+            print(f"  - {row['model']}: {row['entries']} entries, {row['bytes'] / 1e6:.1f} MB")
+
+    def close(self) -> None:
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,213 @@
+"""SQLite manifest tracking the extraction status of every job across runs."""
+
+import sqlite3
+import statistics
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Iterable
+
+DONE = "done"
+FAILED = "failed"
+
+
+class RunManifest:
+    """
+    Records, per job_id, its status, attempt count, last error, latency and tokens.
+
+    Restarts compute the finished set with one query instead of one `stat` per
+    ad, and jobs that failed repeatedly can be deprioritised or skipped. Each
+    run gets a `run_id`, so the same table yields an end-of-run summary.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id INTEGER PRIMARY KEY,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT,
+                latency_s REAL,
+                prompt_tokens INTEGER,
+                output_tokens INTEGER,
+                run_id TEXT,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status);
+            CREATE TABLE IF NOT EXISTS runs (
+                run_id TEXT PRIMARY KEY,
+                started_at REAL NOT NULL,
+                finished_at REAL,
+                description TEXT
+            );
+            """
+        )
+        self.conn.commit()
+        self.run_id = uuid.uuid4().hex[:12]
+        self.started_at = time.time()
+
+    def start_run(self, description: str = "") -> str:
+        with self.lock:
+            self.conn.execute(
+                "INSERT INTO runs (run_id, started_at, description) VALUES (?, ?, ?)",
+                (self.run_id, self.started_at, description),
+            )
+            self.conn.commit()
+        return self.run_id
+
+    def finish_run(self) -> None:
+        with self.lock:
+            self.conn.execute(
+                "UPDATE runs SET finished_at = ? WHERE run_id = ?",
+                (time.time(), self.run_id),
+            )
+            self.conn.commit()
+
+    def sync_with_sink(self, stored_ids: Iterable[int]) -> None:
+        """
+        Aligns the manifest with the results actually present in the sink.
+
+        Results written before the manifest existed are marked done, and jobs
+        marked done whose result has since been removed become pending again.
+        """
+        stored = {int(job_id) for job_id in stored_ids}
+        now = time.time()
+        with self.lock:
+            done = {row[0] for row in self.conn.execute(
+                "SELECT job_id FROM jobs WHERE status = ?", (DONE,)
+            )}
+            self.conn.executemany(
+                """
+                INSERT INTO jobs (job_id, status, attempts, updated_at) VALUES (?, ?, 1, ?)
+                ON CONFLICT (job_id) DO UPDATE SET status = excluded.status,
+                    updated_at = excluded.updated_at
+                """,
+                [(job_id, DONE, now) for job_id in stored - done],
+            )
+            self.conn.executemany(
+                "DELETE FROM jobs WHERE job_id = ?",
+                [(job_id,) for job_id in done - stored],
+            )
+            self.conn.commit()
+
+    def done_ids(self) -> set[int]:
+        with self.lock:
+            return {row[0] for row in self.conn.execute(
+                "SELECT job_id FROM jobs WHERE status = ?", (DONE,)
+            )}
+
+    def failed_attempts(self) -> Dict[int, int]:
+        """Maps every job that is currently failed to its number of attempts."""
+        with self.lock:
+            return dict(self.conn.execute(
+                "SELECT job_id, attempts FROM jobs WHERE status = ?", (FAILED,)
+            ))
+
+    def _record(
+        self,
+        job_id: int,
+        status: str,
+        error: str | None,
+        latency_s: float | None,
+        prompt_tokens: int | None,
+        output_tokens: int | None,
+    ) -> None:
+        with self.lock:
+            self.conn.execute(
+                """
+                INSERT INTO jobs (job_id, status, attempts, last_error, latency_s,
+                                  prompt_tokens, output_tokens, run_id, updated_at)
+                VALUES (?, ?, 1, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (job_id) DO UPDATE SET
+                    status = excluded.status,
+                    attempts = jobs.attempts + 1,
+                    last_error = excluded.last_error,
+                    latency_s = excluded.latency_s,
+                    prompt_tokens = excluded.prompt_tokens,
+                    output_tokens = excluded.output_tokens,
+                    run_id = excluded.run_id,
+                    updated_at = excluded.updated_at
+                """,
+                (
+                    int(job_id),
+                    status,
+                    error,
+                    latency_s,
+                    prompt_tokens,
+                    output_tokens,
+                    self.run_id,
+                    time.time(),
+                ),
+            )
+            self.conn.commit()
+
+    def record_success(
+        self,
+        job_id: int,
+        latency_s: float | None = None,
+        prompt_tokens: int | None = None,
+        output_tokens: int | None = None,
+    ) -> None:
+        self._record(job_id, DONE, None, latency_s, prompt_tokens, output_tokens)
+
+    def record_failure(
+        self, job_id: int, error: str | None, latency_s: float | None = None
+    ) -> None:
+        self._record(job_id, FAILED, error, latency_s, None, None)
+
+    def run_summary(self) -> Dict[str, Any]:
+        """Throughput, latency and token totals of the current run."""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT status, latency_s, prompt_tokens, output_tokens FROM jobs WHERE run_id = ?",
+                (self.run_id,),
+            ).fetchall()
+            pending_failures = self.conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = ?", (FAILED,)
+            ).fetchone()[0]
+        elapsed = time.time() - self.started_at
+        latencies = sorted(r[1] for r in rows if r[0] == DONE and r[1] is not None)
+        done = sum(1 for r in rows if r[0] == DONE)
+        return {
+            "run_id": self.run_id,
+            "elapsed_s": elapsed,
+            "done": done,
+            "failed": sum(1 for r in rows if r[0] == FAILED),
+            "failed_overall": pending_failures,
+            "jobs_per_minute": done / elapsed * 60 if elapsed > 0 else 0.0,
+            "latency_mean_s": statistics.fmean(latencies) if latencies else None,
+            "latency_median_s": statistics.median(latencies) if latencies else None,
+            "prompt_tokens": sum(r[2] or 0 for r in rows),
+            "output_tokens": sum(r[3] or 0 for r in rows),
+        }
+
+    def print_summary(self) -> None:
+        summary = self.run_summary()
+        print(f"\n--- Run Summary ({summary['run_id']}) ---")
+        print(
+            f"Jobs done: {summary['done']}, failed: {summary['failed']} "
+            f"({summary['failed_overall']} failed job(s) outstanding overall)"
+        )
+        print(
+            f"Wall time: {summary['elapsed_s']:.1f}s, "
+            f"throughput: {summary['jobs_per_minute']:.1f} jobs/min"
+        )
+        if summary["latency_mean_s"] is not None:
+            print(
+                f"Latency per job: mean {summary['latency_mean_s']:.2f}s, "
+                f"median {summary['latency_median_s']:.2f}s"
+            )
+        print(
+            f"Tokens: {summary['prompt_tokens']} prompt, {summary['output_tokens']} output"
+        )
+
+    def close(self) -> None:
+        with self.lock:
+            self.conn.close()
@@ -6,29 +6,26 @@ from scipy.stats import chi2_contingency
 from pathlib import Path
 import itertools
 
+from analysis_dataset import INPUT_PROFILES_CSV, INPUT_TIDY_CSV, AnalysisDataset
+
 # --- Configuration ---
 WORKSPACE_DIR = Path(__file__).resolve().parent.parent
-INPUT_TIDY_CSV = WORKSPACE_DIR / "data" / "automated_analysis_consolidated.csv"
-INPUT_PROFILES_CSV = WORKSPACE_DIR / "data" / "automated_analysis_profiles.csv"
 OUTPUT_DIR = WORKSPACE_DIR / "data" / "analysis_results"
 PROFILES_TO_COMPARE = ["GenAI Engineer", "ML Engineer"]
 
 
-def perform_chi_squared_tests(tidy_df, profiles_df):
+def perform_chi_squared_tests(dataset: AnalysisDataset):
     """
     Performs Chi-Squared tests for job_tasks, technologies, and soft_skills
     between GenAI and ML Engineer profiles.
     """
     print("\n--- Performing Chi-Squared Tests ---")
-    df = tidy_df.merge(profiles_df, on="job_id", how="left")
-    df_filtered = df[df["profile"].isin(PROFILES_TO_COMPARE)]
-
     results = []
 
     for category_type in ["job_task", "technology", "soft_skill"]:
+        category_df = dataset.for_profiles(PROFILES_TO_COMPARE, category_type)
         contingency_table = pd.crosstab(
-            df_filtered[df_filtered["category_type"] == category_type]["category_name"],
-            df_filtered[df_filtered["category_type"] == category_type]["profile"],
+            category_df["category_name"], category_df["profile"]
         )
 
         if contingency_table.empty or contingency_table.shape[0] < 2:
@@ -50,10 +47,10 @@ def perform_chi_squared_tests(tidy_df, profiles_df):
     return results_df
 
 
-def technology_cooccurrence_analysis(tidy_df):
+def technology_cooccurrence_analysis(dataset: AnalysisDataset):
     """Analyzes and visualizes the co-occurrence of the top 20 technologies."""
     print("\n--- Performing Technology Co-occurrence Analysis ---")
-    tech_df = tidy_df[tidy_df["category_type"] == "technology"].copy()
+    tech_df = dataset.category("technology").copy()
 
     if "tool_name" not in tech_df.columns or tech_df["tool_name"].isnull().all():
         print(
@@ -163,17 +160,13 @@ def technology_cooccurrence_analysis(tidy_df):
     )
 
 
-def generate_normalized_crosstabs(tidy_df, profiles_df):
+def generate_normalized_crosstabs(dataset: AnalysisDataset):
     """Generates and saves normalized crosstabs for all category types."""
     print("\n--- Generating Normalized Cross-Tabulations ---")
 
-    # Merge profiles into the tidy dataframe first
-    df = pd.merge(tidy_df, profiles_df, on="job_id", how="left")
-    df_filtered = df[df["profile"].isin(PROFILES_TO_COMPARE)]
-
     category_types = ["job_task", "technology", "soft_skill"]
     for cat_type in category_types:
-        category_df = df_filtered[df_filtered["category_type"] == cat_type].copy()
+        category_df = dataset.for_profiles(PROFILES_TO_COMPARE, cat_type)
 
         # Some old cleaning logic might still be trying to use tool_name
         if "tool_name" in category_df.columns and pd.api.types.is_string_dtype(
@@ -236,16 +229,16 @@ def save_normalized_crosstab(category_df, category_type, output_name):
     print(f"Saved normalized cross-tabulation for {category_type} to {output_path}")
 
 
-def analyze_topic_profile_correlation():
+def analyze_topic_profile_correlation(dataset: AnalysisDataset):
     """
     Analyzes the correlation between discovered topics and job profiles.
     Prints a cross-tabulation showing the distribution.
     """
     print("\n--- Analyzing Topic-Profile Correlation ---")
+    profiles_df = dataset.profiles
 
     # Load necessary files
     try:
-        profiles_df = pd.read_csv(INPUT_PROFILES_CSV)
         topics_df = pd.read_csv(OUTPUT_DIR / "job_topic_mapping.csv")
         topic_defs_df = pd.read_csv(OUTPUT_DIR / "topic_definitions.csv").set_index(
             "topic_id"
@@ -281,6 +274,8 @@ def analyze_topic_profile_correlation():
         col for col in cols_to_drop if col in correlation_table.columns
     ]
     correlation_table = correlation_table.drop(columns=existing_cols_to_drop)
+    # Profiles are categorical; plain labels let the topic keywords be joined.
+    correlation_table.columns = correlation_table.columns.astype(str)
 
     # Add the topic keywords for context
     correlation_table_with_defs = correlation_table.join(topic_defs_df)
@@ -299,13 +294,12 @@ def main():
     Main function to run all statistical analyses.
     """
     OUTPUT_DIR.mkdir(exist_ok=True)
-    tidy_df = pd.read_csv(INPUT_TIDY_CSV)
-    profiles_df = pd.read_csv(INPUT_PROFILES_CSV)
+    dataset = AnalysisDataset.load(INPUT_TIDY_CSV, INPUT_PROFILES_CSV)
 
-    perform_chi_squared_tests(tidy_df.copy(), profiles_df.copy())
-    technology_cooccurrence_analysis(tidy_df.copy())
-    generate_normalized_crosstabs(tidy_df.copy(), profiles_df.copy())
-    analyze_topic_profile_correlation()
+    perform_chi_squared_tests(dataset)
+    technology_cooccurrence_analysis(dataset)
+    generate_normalized_crosstabs(dataset)
+    analyze_topic_profile_correlation(dataset)
 
     print("\n--- Statistical Analysis Complete ---")
 
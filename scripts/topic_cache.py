@@ -0,0 +1,91 @@
+"""
+On-disk caches for topic modeling: preprocessed tokens and TF-IDF matrices.
+
+Lemmatizing the corpus dominates the runtime of `topic_modeling.py`, but its
+output only depends on the text, the spaCy pipeline and the stop words.
+Tokens are therefore cached per document, keyed by a hash of the text, in a
+table specific to the preprocessing configuration. TF-IDF matrices are cached
+as `.npz` files with their vocabulary, keyed by the documents and the
+vectorizer settings, so changing only the number of topics skips straight to
+LDA.
+"""
+
+import hashlib
+import json
+from pathlib import Path
+from typing import Dict, List
+
+import pandas as pd
+import scipy.sparse
+
+from artifacts import write_artifact
+
+
+def digest(value, size: int = 16) -> str:
+    """Hex BLAKE2b digest of a string, or of the JSON encoding of other values."""
+    if not isinstance(value, str):
+        value = json.dumps(value, sort_keys=True)
+    return hashlib.blake2b(value.encode("utf-8"), digest_size=size).hexdigest()
+
+
+class TokenCache:
+    """
+    Preprocessed text per document for one preprocessing configuration.
+
+    The table lives in `<cache_dir>/tokens_<config_key>.parquet`, mapping
+    `text_hash` to `processed_text`; configurations never share entries.
+    """
+
+    def __init__(self, cache_dir: Path, config_key: str):
+        self.path = Path(cache_dir) / f"tokens_{config_key}.parquet"
+        self.tokens: Dict[str, str] = {}
+        self.added = 0
+        if self.path.exists():
+            table = pd.read_parquet(self.path)
+            self.tokens = dict(zip(table["text_hash"], table["processed_text"]))
+
+    def lookup(self, text_hashes: List[str]) -> List[str | None]:
+        return [self.tokens.get(h) for h in text_hashes]
+
+    def update(self, text_hashes: List[str], processed: List[str]) -> None:
+        for text_hash, text in zip(text_hashes, processed):
+            if text_hash not in self.tokens:
+                self.added += 1
+            self.tokens[text_hash] = text
+
+    def save(self) -> None:
+        if not self.added:
+            return
+        table = pd.DataFrame(
+            {"text_hash": list(self.tokens), "processed_text": list(self.tokens.values())}
+        )
+        write_artifact(table, self.path, "parquet")
+        self.added = 0
+
+
+def tfidf_paths(cache_dir: Path, key: str):
+    cache_dir = Path(cache_dir)
+    return cache_dir / f"tfidf_{key}.npz", cache_dir / f"tfidf_{key}.vocabulary.json"
+
+
+def load_tfidf(cache_dir: Path, key: str):
+    """The cached (matrix, feature names) for `key`, or None if not cached."""
+    matrix_path, vocabulary_path = tfidf_paths(cache_dir, key)
+    if not (matrix_path.exists() and vocabulary_path.exists()):
+        return None
+    with open(vocabulary_path, encoding="utf-8") as f:
+        feature_names = json.load(f)
+    return scipy.sparse.load_npz(matrix_path), feature_names
+
+
+def save_tfidf(cache_dir: Path, key: str, matrix, feature_names) -> None:
+    matrix_path, vocabulary_path = tfidf_paths(cache_dir, key)
+    matrix_path.parent.mkdir(parents=True, exist_ok=True)
+    # save_npz appends .npz to names without it, so keep the suffix on the tmp file.
+    tmp_matrix = matrix_path.with_name(matrix_path.stem + ".tmp.npz")
+    scipy.sparse.save_npz(tmp_matrix, scipy.sparse.csr_matrix(matrix))
+    tmp_matrix.replace(matrix_path)
+    tmp_vocabulary = vocabulary_path.with_suffix(".tmp")
+    with open(tmp_vocabulary, "w", encoding="utf-8") as f:
+        json.dump(list(feature_names), f)
+    tmp_vocabulary.replace(vocabulary_path)
@@ -3,49 +3,66 @@ import spacy
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.decomposition import LatentDirichletAllocation
 from pathlib import Path
+import argparse
+import itertools
+import os
 import re
+import joblib
 import numpy as np
+from joblib import Parallel, delayed
 from spacy.lang.en.stop_words import STOP_WORDS as en_stop
 from spacy.lang.nl.stop_words import STOP_WORDS as nl_stop
 
+from artifacts import read_artifact
+from topic_cache import TokenCache, digest, load_tfidf, save_tfidf
+
 # --- Configuration ---
 WORKSPACE_DIR = Path(__file__).resolve().parent.parent
 INPUT_DATA_CSV = WORKSPACE_DIR / "data" / "consolidated_deduplicated.csv"
 OUTPUT_DIR = WORKSPACE_DIR / "data" / "analysis_results"
+CACHE_DIR = WORKSPACE_DIR / "data" / "cache" / "topic_modeling"
+MODEL_DIR = WORKSPACE_DIR / "data" / "models"
 NUM_TOPICS = 10
 TOP_WORDS_PER_TOPIC = 15
+MAX_DF = 0.9
+MIN_DF = 25
 
 # --- SpaCy setup ---
-# Load the spaCy model. Ensure you have downloaded it:
-# python -m spacy download en_core_web_sm
-try:
-    nlp = spacy.load("en_core_web_sm")
-except OSError:
-    print("Spacy model 'en_core_web_sm' not found.")
-    print("Please run: python -m spacy download en_core_web_sm")
-    exit()
+# Only the components needed for lemmas are run; the dependency parser and
+# named entity recognizer are by far the slowest parts of the pipeline.
+SPACY_MODEL = "en_core_web_sm"
+DISABLED_COMPONENTS = ["parser", "ner"]
+# Bump when clean_text or lemmas change, to invalidate cached tokens.
+PREPROCESSING_VERSION = 1
+BATCH_SIZE = 64
+N_PROCESS = os.cpu_count() or 1
 
 # Combine English and Dutch stop words for more robust filtering
 custom_stopwords = en_stop.union(nl_stop)
 
 
-def preprocess_text(text):
-    """
-    Cleans and prepares text for topic modeling using spaCy.
-    - Removes punctuation and numbers
-    - Converts to lowercase
-    - Lemmatizes
-    - Removes a combined list of English and Dutch stop words
+def load_nlp():
+    """Loads the spaCy model without the components lemmatization does not need.
+
+    Ensure you have downloaded it: python -m spacy download en_core_web_sm
     """
+    try:
+        return spacy.load(SPACY_MODEL, disable=DISABLED_COMPONENTS)
+    except OSError:
+        print(f"Spacy model '{SPACY_MODEL}' not found.")
+        print(f"Please run: python -m spacy download {SPACY_MODEL}")
+        exit()
+
+
+def clean_text(text):
+    """Removes non-alphabetic characters and converts to lowercase."""
     if not isinstance(text, str):
         return ""
+    return re.sub(r"[^a-zA-Z\s]", "", text, re.I | re.A).lower().strip()
 
-    # Remove non-alphabetic characters and convert to lowercase
-    text = re.sub(r"[^a-zA-Z\s]", "", text, re.I | re.A).lower().strip()
 
-    doc = nlp(text)
-
-    # Lemmatize and remove stop words
+def lemmas(doc):
+    """Lemmatizes a processed document and removes stop words."""
     tokens = [
         token.lemma_
         for token in doc
@@ -53,10 +70,106 @@ def preprocess_text(text):
         and token.is_alpha
         and len(token.lemma_) > 2
     ]
-
     return " ".join(tokens)
 
 
+def preprocess_texts(nlp, texts, batch_size=BATCH_SIZE, n_process=N_PROCESS):
+    """
+    Cleans and prepares texts for topic modeling using spaCy.
+    - Removes punctuation and numbers
+    - Converts to lowercase
+    - Lemmatizes
+    - Removes a combined list of English and Dutch stop words
+
+    Documents are streamed through `nlp.pipe` in batches of `batch_size`,
+    spread over `n_process` worker processes.
+    """
+    cleaned = (clean_text(text) for text in texts)
+    docs = nlp.pipe(cleaned, batch_size=batch_size, n_process=n_process)
+    return [lemmas(doc) for doc in docs]
+
+
+def preprocessing_key():
+    """Identifies everything the preprocessed tokens depend on besides the text."""
+    return digest(
+        {
+            "model": SPACY_MODEL,
+            "model_version": spacy.util.get_package_version(SPACY_MODEL),
+            "spacy_version": spacy.__version__,
+            "disabled": DISABLED_COMPONENTS,
+            "stopwords": digest(sorted(custom_stopwords)),
+            "version": PREPROCESSING_VERSION,
+        },
+        size=8,
+    )
+
+
+def load_corpus():
+    """The deduplicated job ads with the title and description combined in `full_text`."""
+    df = read_artifact(
+        INPUT_DATA_CSV, columns=["job_id", "Vacaturetitel", "Functieomschrijving"]
+    )
+    # Combine relevant text fields for a comprehensive analysis
+    df["full_text"] = (
+        df["Vacaturetitel"].fillna("") + " " + df["Functieomschrijving"].fillna("")
+    )
+    return df
+
+
+def preprocess_corpus(df, batch_size=BATCH_SIZE, n_process=N_PROCESS, use_cache=True):
+    """
+    The preprocessed text of each row of `df`, lemmatizing only documents
+    whose text is not in the token cache yet.
+    """
+    text_hashes = [digest(text) for text in df["full_text"]]
+    cache = TokenCache(CACHE_DIR, preprocessing_key()) if use_cache else None
+    processed = cache.lookup(text_hashes) if cache else [None] * len(df)
+    missing = [i for i, text in enumerate(processed) if text is None]
+    print(f"{len(df) - len(missing)} of {len(df)} documents found in the token cache.")
+
+    if missing:
+        print(
+            f"Preprocessing {len(missing)} documents with {n_process} process(es), "
+            f"batch size {batch_size}..."
+        )
+        nlp = load_nlp()
+        new_texts = preprocess_texts(
+            nlp,
+            df["full_text"].iloc[missing],
+            batch_size=batch_size,
+            n_process=n_process,
+        )
+        for i, text in zip(missing, new_texts):
+            processed[i] = text
+        if cache:
+            cache.update([text_hashes[i] for i in missing], new_texts)
+            cache.save()
+    return pd.Series(processed, index=df.index, dtype=object)
+
+
+def vectorize(processed_docs, max_df=MAX_DF, min_df=MIN_DF, use_cache=True):
+    """
+    The TF-IDF matrix and feature names of `processed_docs`, loaded from the
+    cache if the same documents were vectorized with the same settings before.
+    """
+    key = digest(
+        {"docs": digest("\x1e".join(processed_docs)), "max_df": max_df, "min_df": min_df}
+    )
+    cached = load_tfidf(CACHE_DIR, key) if use_cache else None
+    if cached is not None:
+        print("Loaded TF-IDF matrix from cache.")
+        return cached
+
+    print("Vectorizing text with TF-IDF...")
+    # We use TF-IDF to give higher weight to words that are more unique to a document
+    vectorizer = TfidfVectorizer(max_df=max_df, min_df=min_df)
+    tfidf_matrix = vectorizer.fit_transform(processed_docs)
+    feature_names = vectorizer.get_feature_names_out()
+    if use_cache:
+        save_tfidf(CACHE_DIR, key, tfidf_matrix, feature_names)
+    return tfidf_matrix, feature_names
+
+
 def display_topics(model, feature_names, no_top_words):
     """Prints the top words for each topic."""
     topic_dict = {}
@@ -69,53 +182,104 @@ def display_topics(model, feature_names, no_top_words):
     return topic_dict
 
 
-def main():
+def umass_coherence(model, tfidf_matrix, top_n=TOP_WORDS_PER_TOPIC):
     """
-    Main function to run the topic modeling pipeline.
+    Mean UMass coherence of the topics' top words; closer to zero is better.
+
+    For each topic, averages log((D(w_i, w_j) + 1) / D(w_j)) over pairs of its
+    top words, where w_j ranks above w_i and D counts the documents
+    containing the word(s).
     """
-    OUTPUT_DIR.mkdir(exist_ok=True)
+    presence = (tfidf_matrix > 0).astype(np.int32).tocsc()
+    scores = []
+    for topic in model.components_:
+        top = topic.argsort()[: -top_n - 1 : -1]
+        words = presence[:, top]
+        co_occurrence = (words.T @ words).toarray()
+        doc_freq = np.diag(co_occurrence)
+        pairs = [
+            np.log((co_occurrence[i, j] + 1) / doc_freq[j])
+            for i in range(1, len(top))
+            for j in range(i)
+        ]
+        scores.append(np.mean(pairs))
+    return float(np.mean(scores))
 
-    print("Loading data...")
-    df = pd.read_csv(INPUT_DATA_CSV)
 
-    # Combine relevant text fields for a comprehensive analysis
-    df["full_text"] = (
-        df["Vacaturetitel"].fillna("") + " " + df["Functieomschrijving"].fillna("")
-    )
+def fit_lda(tfidf_matrix, num_topics, seed):
+    """Fits one LDA configuration and scores it."""
+    lda = LatentDirichletAllocation(n_components=num_topics, random_state=seed)
+    lda.fit(tfidf_matrix)
+    return {
+        "num_topics": num_topics,
+        "seed": seed,
+        "perplexity": lda.perplexity(tfidf_matrix),
+        "umass_coherence": umass_coherence(lda, tfidf_matrix),
+        "model": lda,
+    }
 
-    print("Preprocessing text data... (this may take a few minutes)")
-    df["processed_text"] = df["full_text"].apply(preprocess_text)
 
-    # Filter out any empty documents that might result from preprocessing
-    processed_docs = df["processed_text"][df["processed_text"].str.len() > 0]
+def sweep(tfidf_matrix, feature_names, topic_counts, seeds, n_jobs=-1):
+    """
+    Fits LDA for every combination of `topic_counts` and `seeds` in parallel
+    and returns the model with the best coherence.
 
-    print("Vectorizing text with TF-IDF...")
-    # We use TF-IDF to give higher weight to words that are more unique to a document
-    vectorizer = TfidfVectorizer(max_df=0.9, min_df=25)
-    tfidf_matrix = vectorizer.fit_transform(processed_docs)
+    Scores are saved to lda_sweep_results.csv; the best model and its
+    vocabulary are saved to MODEL_DIR for reuse.
+    """
+    configs = list(itertools.product(topic_counts, seeds))
+    print(f"Sweeping {len(configs)} LDA configurations with n_jobs={n_jobs}...")
+    fits = Parallel(n_jobs=n_jobs, verbose=5)(
+        delayed(fit_lda)(tfidf_matrix, k, seed) for k, seed in configs
+    )
 
-    print(f"Running Latent Dirichlet Allocation (LDA) for {NUM_TOPICS} topics...")
-    lda = LatentDirichletAllocation(n_components=NUM_TOPICS, random_state=42)
-    lda.fit(tfidf_matrix)
+    results = pd.DataFrame([{k: v for k, v in f.items() if k != "model"} for f in fits])
+    results = results.sort_values("umass_coherence", ascending=False)
+    print(results.to_string(index=False))
+    results_path = OUTPUT_DIR / "lda_sweep_results.csv"
+    results.to_csv(results_path, index=False)
+    print(f"Saved sweep results to {results_path}")
 
-    print("\n--- Discovered Topics ---")
-    feature_names = vectorizer.get_feature_names_out()
-    topics = display_topics(lda, feature_names, TOP_WORDS_PER_TOPIC)
+    best = max(fits, key=lambda f: f["umass_coherence"])
+    print(
+        f"Best configuration: {best['num_topics']} topics, seed {best['seed']} "
+        f"(UMass coherence {best['umass_coherence']:.3f})"
+    )
+    MODEL_DIR.mkdir(parents=True, exist_ok=True)
+    model_path = MODEL_DIR / "lda_sweep_best.joblib"
+    joblib.dump(
+        {
+            "model": best["model"],
+            "feature_names": list(feature_names),
+            "num_topics": best["num_topics"],
+            "seed": best["seed"],
+        },
+        model_path,
+    )
+    print(f"Saved best model to {model_path}")
+    return best["model"]
 
-    # --- Assign dominant topic to each document ---
-    print("\nAssigning dominant topic to each job ad...")
+
+def dominant_topics(df, processed_docs, lda, tfidf_matrix):
+    """The dominant topic of each processed document, keyed by job_id."""
     doc_topic_dist = lda.transform(tfidf_matrix)
     dominant_topic = np.argmax(doc_topic_dist, axis=1)
 
     # Create a DataFrame with job_id and the assigned topic
-    # We need to align it with the original DataFrame's index
-    df_topics = pd.DataFrame(
-        {"job_id": processed_docs.index, "dominant_topic": dominant_topic}
+    return pd.DataFrame(
+        {
+            "job_id": df.loc[processed_docs.index, "job_id"].to_numpy(),
+            "dominant_topic": dominant_topic,
+        }
     )
 
-    output_topic_mapping_path = OUTPUT_DIR / "job_topic_mapping.csv"
-    df_topics.to_csv(output_topic_mapping_path, index=False)
-    print(f"Saved job-to-topic mapping to {output_topic_mapping_path}")
+
+def save_topic_definitions(lda, feature_names):
+    """Saves the top words of each topic as CSV and as a readable text file."""
+    num_topics = lda.n_components
+
+    print("\n--- Discovered Topics ---")
+    topics = display_topics(lda, feature_names, TOP_WORDS_PER_TOPIC)
 
     # Save topic definitions to a file
     df_topic_defs = pd.DataFrame.from_dict(
@@ -129,7 +293,7 @@ def main():
     # Save results to a text file
     output_path = OUTPUT_DIR / "topic_modeling_results.txt"
     with open(output_path, "w", encoding="utf-8") as f:
-        f.write(f"Topic Modeling Results ({NUM_TOPICS} topics)\n")
+        f.write(f"Topic Modeling Results ({num_topics} topics)\n")
         f.write("=" * 40 + "\n")
         for topic_id, words in topics.items():
             f.write(f"Topic {topic_id}: {words}\n")
@@ -137,5 +301,238 @@ def main():
     print(f"\nSaved topic modeling results to {output_path}")
 
 
+def write_topic_outputs(df, processed_docs, lda, tfidf_matrix, feature_names):
+    """Saves the topic definitions and each job's dominant topic."""
+    # --- Assign dominant topic to each document ---
+    print("\nAssigning dominant topic to each job ad...")
+    df_topics = dominant_topics(df, processed_docs, lda, tfidf_matrix)
+
+    output_topic_mapping_path = OUTPUT_DIR / "job_topic_mapping.csv"
+    df_topics.to_csv(output_topic_mapping_path, index=False)
+    print(f"Saved job-to-topic mapping to {output_topic_mapping_path}")
+
+    save_topic_definitions(lda, feature_names)
+
+
+def mapping_digest(mapping_path):
+    """Digest of the job-to-topic mapping file, or None if it does not exist."""
+    if not mapping_path.exists():
+        return None
+    return digest(mapping_path.read_text(encoding="utf-8"))
+
+
+def update_online_model(
+    df, num_topics, max_df, min_df, batch_size, n_process, use_cache
+):
+    """
+    Assigns topics to job ads not seen by the persisted online LDA model.
+
+    The first run fits the vectorizer and an online LDA model on the whole
+    corpus and writes all outputs. Later runs only preprocess the new ads,
+    vectorize them with the persisted vocabulary, update the model with
+    `partial_fit` and append their rows to job_topic_mapping.csv, so topic
+    ids stay the same and the cost grows with the number of new ads. Words
+    outside the original vocabulary are ignored.
+
+    The model records a digest of the mapping it last wrote. If another run
+    (a full fit, a sweep or embedding_topic_modeling.py) has replaced the
+    mapping since, its topic ids belong to a different model and nothing is
+    appended. The same holds if `num_topics`, `max_df` or `min_df` differ
+    from those the model was fitted with.
+    """
+    params = {"num_topics": num_topics, "max_df": max_df, "min_df": min_df}
+    model_path = MODEL_DIR / "lda_online.joblib"
+    mapping_path = OUTPUT_DIR / "job_topic_mapping.csv"
+
+    if not model_path.exists():
+        print(f"No online model at {model_path}; fitting one on all {len(df)} job ads...")
+        df["processed_text"] = preprocess_corpus(df, batch_size, n_process, use_cache)
+        processed_docs = df["processed_text"][df["processed_text"].str.len() > 0]
+        vectorizer = TfidfVectorizer(max_df=max_df, min_df=min_df)
+        tfidf_matrix = vectorizer.fit_transform(processed_docs)
+        lda = LatentDirichletAllocation(
+            n_components=num_topics, learning_method="online", random_state=42
+        )
+        lda.fit(tfidf_matrix)
+        write_topic_outputs(
+            df, processed_docs, lda, tfidf_matrix, vectorizer.get_feature_names_out()
+        )
+        seen_job_ids = set(df["job_id"])
+    else:
+        state = joblib.load(model_path)
+        vectorizer, lda = state["vectorizer"], state["model"]
+        seen_job_ids = set(state["job_ids"])
+        if state.get("params") != params:
+            raise RuntimeError(
+                f"The online model in {model_path} was fitted with {state.get('params')}, "
+                f"not {params}. Delete {model_path} to refit it with these settings, "
+                "or run with the persisted ones."
+            )
+        if mapping_digest(mapping_path) != state.get("mapping_digest"):
+            raise RuntimeError(
+                f"{mapping_path} was not written by the online model in {model_path}; "
+                "its topic ids would be mixed with another model's. Run without "
+                f"--incremental, or delete {model_path} to refit the online model."
+            )
+        new_df = df[~df["job_id"].isin(seen_job_ids)].copy()
+        if new_df.empty:
+            print("No new job ads since the last update.")
+            return
+        print(f"Updating the online model with {len(new_df)} new job ads...")
+        new_df["processed_text"] = preprocess_corpus(
+            new_df, batch_size, n_process, use_cache
+        )
+        processed_docs = new_df["processed_text"][
+            new_df["processed_text"].str.len() > 0
+        ]
+        if not processed_docs.empty:
+            tfidf_matrix = vectorizer.transform(processed_docs)
+            lda.partial_fit(tfidf_matrix)
+            df_topics = dominant_topics(new_df, processed_docs, lda, tfidf_matrix)
+            df_topics.to_csv(
+                mapping_path,
+                mode="a",
+                header=not mapping_path.exists(),
+                index=False,
+            )
+            print(f"Appended {len(df_topics)} job-to-topic rows to {mapping_path}")
+            save_topic_definitions(lda, vectorizer.get_feature_names_out())
+        seen_job_ids |= set(new_df["job_id"])
+
+    MODEL_DIR.mkdir(parents=True, exist_ok=True)
+    joblib.dump(
+        {
+            "vectorizer": vectorizer,
+            "model": lda,
+            "job_ids": sorted(seen_job_ids),
+            "params": params,
+            "mapping_digest": mapping_digest(mapping_path),
+        },
+        model_path,
+    )
+    print(f"Saved online model to {model_path}")
+
+
+def main(
+    batch_size=BATCH_SIZE,
+    n_process=N_PROCESS,
+    num_topics=NUM_TOPICS,
+    max_df=MAX_DF,
+    min_df=MIN_DF,
+    use_cache=True,
+    sweep_topics=None,
+    seeds=(42,),
+    n_jobs=-1,
+    incremental=False,
+):
+    """
+    Main function to run the topic modeling pipeline.
+
+    With `sweep_topics`, LDA is fit for each of these topic counts and each
+    of `seeds`, and the outputs are written for the most coherent model.
+    With `incremental`, only new job ads are processed; see `update_online_model`.
+    """
+    OUTPUT_DIR.mkdir(exist_ok=True)
+
+    print("Loading data...")
+    df = load_corpus()
+    if incremental:
+        update_online_model(
+            df, num_topics, max_df, min_df, batch_size, n_process, use_cache
+        )
+        return
+    df["processed_text"] = preprocess_corpus(df, batch_size, n_process, use_cache)
+
+    # Filter out any empty documents that might result from preprocessing
+    processed_docs = df["processed_text"][df["processed_text"].str.len() > 0]
+
+    tfidf_matrix, feature_names = vectorize(processed_docs, max_df, min_df, use_cache)
+
+    if sweep_topics:
+        lda = sweep(tfidf_matrix, feature_names, sweep_topics, seeds, n_jobs)
+    else:
+        print(f"Running Latent Dirichlet Allocation (LDA) for {num_topics} topics...")
+        lda = LatentDirichletAllocation(n_components=num_topics, random_state=42)
+        lda.fit(tfidf_matrix)
+
+    write_topic_outputs(df, processed_docs, lda, tfidf_matrix, feature_names)
+
+
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(
+        description="Discover topics in the job ad texts with LDA.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=BATCH_SIZE,
+        help="Documents per spaCy batch.",
+    )
+    parser.add_argument(
+        "--n-process",
+        type=int,
+        default=N_PROCESS,
+        help="spaCy worker processes for preprocessing.",
+    )
+    parser.add_argument(
+        "--num-topics", type=int, default=NUM_TOPICS, help="Number of LDA topics."
+    )
+    parser.add_argument(
+        "--max-df",
+        type=float,
+        default=MAX_DF,
+        help="Ignore terms in more than this fraction of documents.",
+    )
+    parser.add_argument(
+        "--min-df",
+        type=int,
+        default=MIN_DF,
+        help="Ignore terms in fewer than this many documents.",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help=f"Neither read nor write the token and TF-IDF caches in {CACHE_DIR}.",
+    )
+    parser.add_argument(
+        "--sweep-topics",
+        type=int,
+        nargs="+",
+        metavar="K",
+        help="Fit LDA for each of these topic counts and keep the most coherent model.",
+    )
+    parser.add_argument(
+        "--seeds",
+        type=int,
+        nargs="+",
+        default=[42],
+        help="Random seeds to fit for each topic count in --sweep-topics.",
+    )
+    parser.add_argument(
+        "--n-jobs",
+        type=int,
+        default=-1,
+        help="Parallel LDA fits in --sweep-topics mode (-1: all cores).",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Update a persisted online LDA model with new job ads only, keeping topic ids stable.",
+    )
+    args = parser.parse_args()
+    if args.incremental and args.sweep_topics:
+        parser.error("--incremental cannot be combined with --sweep-topics")
+
+    main(
+        batch_size=args.batch_size,
+        n_process=args.n_process,
+        num_topics=args.num_topics,
+        max_df=args.max_df,
+        min_df=args.min_df,
+        use_cache=not args.no_cache,
+        sweep_topics=args.sweep_topics,
+        seeds=args.seeds,
+        n_jobs=args.n_jobs,
+        incremental=args.incremental,
+    )